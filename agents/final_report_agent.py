@@ -1,11 +1,31 @@
+import os
+import asyncio
+from concurrent.futures import as_completed
 from pydantic import BaseModel, Field
 from langchain_core.tools.structured import StructuredTool
-from langchain_openai import ChatOpenAI
+from langchain_core.runnables.config import ContextThreadPoolExecutor
 from dotenv import load_dotenv
+from utils.clients import get_client
 
 load_dotenv()
 
-llm = ChatOpenAI(model="gpt-4o", temperature=0)
+# "sections" writes each report section in its own concurrent gpt-4o call;
+# "single" asks one call for the whole report
+REPORT_COMPOSER = os.getenv("REPORT_COMPOSER", "sections").lower()
+
+# (field, heading, writing brief) in report order
+REPORT_SECTIONS = [
+    ("executive_summary", "Executive Summary",
+     "Expand the executive summary to about 3000 words: key findings, numbered takeaways and what they mean for stakeholders."),
+    ("market_overview", "Market Overview",
+     "Expand the market overview to about 4000 words: market context, trends, competitors and consumer behaviour. "
+     "Insert source images as actual images and include video links properly."),
+    ("quantitative_analysis", "Quantitative Analysis",
+     "Expand the quantitative analysis and internal insights to about 6000 words: interpret every number, table and chart. "
+     "Keep every chart image link exactly as given."),
+    ("recommendations", "Recommendations",
+     "Expand the recommendations to about 6000 words: actionable, prioritised next steps with rationale, risks and metrics."),
+]
 
 class FinalReportInput(BaseModel):
     executive_summary: str = Field(..., description="Concise summary of key findings")
@@ -15,10 +35,8 @@ class FinalReportInput(BaseModel):
     recommendations: str = Field(..., description="Actionable next steps")
     sources: str = Field(..., description="Sources used")
 
-def _final_report_logic(**kwargs) -> str:
-    # Convert keyword arguments to a FinalReportInput instance
-    data = FinalReportInput(**kwargs)
-    prompt = f"""
+def build_report_prompt(data: FinalReportInput) -> str:
+    return f"""
 You are a business analyst, technical writer, who can write long reports and include images, sources, links in detail, tasked with preparing a detailed,
 professional Gartner-style report. You have to write a comprehensive 20–30 page stakeholder-facing research report (6000–12000 words) in markdown format.
 
@@ -49,7 +67,120 @@ Recommendations:
 Sources:
 {data.sources}
 """
-    return llm.invoke(prompt).content
+
+def build_section_prompt(data: FinalReportInput, heading: str, brief: str) -> str:
+    return f"""
+You are a business analyst and technical writer preparing one section of a detailed, professional
+Gartner-style stakeholder report in markdown. Other analysts are writing the remaining sections in
+parallel from the same material, so write ONLY the "{heading}" section.
+
+Start with the heading "## {heading}" and use sub-headers, bullet points, numbered takeaways and a clear
+professional tone. Keep image markdown and links from the material intact.
+
+{brief}
+
+Shared research material for the whole report:
+---
+Executive Summary:
+{data.executive_summary}
+
+Market Overview:
+{data.market_overview}
+
+Internal Insights:
+{data.internal_insights}
+
+Quantitative Analysis:
+{data.quantitative_analysis}
+
+Recommendations:
+{data.recommendations}
+
+Sources:
+{data.sources}
+"""
+
+def _section_llm(field: str):
+    # the tag lets streaming consumers tell concurrent sections' tokens apart
+    return get_client("chat").with_config(tags=[f"report_section:{field}"], run_name=f"report_section_{field}")
+
+def _sources_section(data: FinalReportInput) -> str:
+    return f"## Sources\n\n{data.sources}" if data.sources.strip() else ""
+
+def iter_report_sections(data: FinalReportInput):
+    """
+    Write all sections concurrently and yield (index, field, markdown) as each
+    one finishes, in completion order.
+    """
+    with ContextThreadPoolExecutor(max_workers=len(REPORT_SECTIONS)) as executor:
+        futures = {
+            executor.submit(_section_llm(field).invoke, build_section_prompt(data, heading, brief)): (i, field)
+            for i, (field, heading, brief) in enumerate(REPORT_SECTIONS)
+        }
+        for future in as_completed(futures):
+            i, field = futures[future]
+            yield i, field, future.result().content
+
+def compose_report(data: FinalReportInput) -> str:
+    """Section-parallel report: total time is roughly that of the longest section."""
+    sections = [None] * len(REPORT_SECTIONS)
+    for i, field, text in iter_report_sections(data):
+        print(f"Report section finished: {field}")
+        sections[i] = text
+    return "\n\n".join(part for part in sections + [_sources_section(data)] if part)
+
+def _final_report_logic(**kwargs) -> str:
+    # Convert keyword arguments to a FinalReportInput instance
+    data = FinalReportInput(**kwargs)
+    if REPORT_COMPOSER == "sections":
+        return compose_report(data)
+    return get_client("chat").invoke(build_report_prompt(data)).content
+
+async def astream_final_report(**kwargs):
+    """
+    Async generator yielding (section, token) pairs as gpt-4o writes the report.
+    In section mode the sections stream concurrently, so tokens of different
+    sections interleave; `section` is None in single-call mode.
+    """
+    data = FinalReportInput(**kwargs)
+    if REPORT_COMPOSER != "sections":
+        async for chunk in get_client("chat").astream(build_report_prompt(data)):
+            if chunk.content:
+                yield None, chunk.content
+        return
+
+    queue = asyncio.Queue()
+
+    async def write(field, heading, brief):
+        try:
+            async for chunk in _section_llm(field).astream(build_section_prompt(data, heading, brief)):
+                if chunk.content:
+                    await queue.put((field, chunk.content))
+        finally:
+            await queue.put((field, None))
+
+    tasks = [asyncio.create_task(write(*section)) for section in REPORT_SECTIONS]
+    try:
+        remaining = len(tasks)
+        while remaining:
+            field, token = await queue.get()
+            if token is None:
+                remaining -= 1
+            else:
+                yield field, token
+        for task in tasks:
+            task.result()  # surface section failures
+    finally:
+        for task in tasks:
+            task.cancel()
+    sources = _sources_section(data)
+    if sources:
+        yield "sources", sources
+
+def assemble_sections(section_texts: dict) -> str:
+    """Join streamed section texts in report order (sources last)."""
+    order = [field for field, _, _ in REPORT_SECTIONS] + ["sources", None]
+    return "\n\n".join(section_texts[key] for key in order if section_texts.get(key))
 
 final_report_tool = StructuredTool.from_function(
     name="final_report_tool",
@@ -1,22 +1,128 @@
 from dotenv import load_dotenv
-from mistralai import Mistral
 import os
-from openai import OpenAI
-from PIL import Image
+import re
+import json
+import hashlib
+import threading
+from contextlib import contextmanager
 from base64 import b64decode
+from utils.artifact_store import artifact_store
+from utils.cache import TTLCache
+from utils.telemetry import trace_call, record_openai_usage
+from utils.clients import get_client
 
 load_dotenv()
 
-mistral_key = os.getenv("MISTRAL_API_KEY")
-mistral = Mistral(api_key=mistral_key)
+# every parameter that changes the generated pixels belongs in the cache key
+IMAGE_PARAMS = {
+    "model": "dall-e-2",
+    "size": "1024x1024",
+    "quality": "standard",
+    "style": "vivid",
+}
 
-open_ai_key = os.getenv("OPENAI_API_KEY")
-openai_client = OpenAI(api_key=open_ai_key)
+# one DALL·E call per cache key at a time; concurrent identical requests wait for it
+_generation_locks = {}  # key -> [lock, holders and waiters]; dropped when the last one leaves
+_generation_locks_guard = threading.Lock()
+
+
+@contextmanager
+def _generation_lock(key: str):
+    with _generation_locks_guard:
+        entry = _generation_locks.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _generation_locks_guard:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del _generation_locks[key]
+
+# short, keyword-rich queries are compressed locally; longer ones go to Mistral (memoized)
+LOCAL_COMPRESSION_MAX_WORDS = int(os.getenv("LOCAL_COMPRESSION_MAX_WORDS", "40"))
+LOCAL_COMPRESSION_MIN_KEYWORDS = 2
+prompt_cache = TTLCache("image_prompts", max_size=256, ttl_seconds=7 * 24 * 3600)
+
+STOPWORDS = {
+    "a", "an", "the", "of", "for", "in", "on", "to", "and", "or", "with", "about", "by", "at",
+    "is", "are", "was", "were", "be", "it", "its", "this", "that", "these", "those", "me", "my",
+    "i", "we", "our", "you", "your", "can", "could", "would", "please", "show", "give", "want",
+    "what", "which", "how", "generate", "create", "make", "draw", "image", "picture", "visual",
+    "showing", "shows", "see", "need", "like", "most", "least", "top", "best", "searched", "search", "searches",
+    "popular", "do", "does", "did", "has", "have", "had", "will", "should", "why", "who", "where", "when",
+    "from", "into", "over", "than", "between", "vs", "per", "during", "among", "people", "there", "their",
+}
+# what is left of the prompt still asks for an analysis, not a scene; Mistral turns those into a visual
+ANALYTICAL_WORDS = re.compile(
+    r"\b(most|least|top|best|worst|highest|lowest|rank\w*|trend\w*|grow\w*|compar\w*|versus|vs|why|how|which|what|"
+    r"who|when|where|should|share|percent\w*|average|statistics|data|searched|popular\w*|performance|sales)\b",
+    re.I,
+)
+# "how/why/when ..." questions ask about a process or a reason; only "what/which is ..." name a subject
+EXPLANATORY_QUESTION = re.compile(r"^(how|why|who|where|when)\b", re.I)
+FILLER_PATTERNS = [
+    r"^(what|which|who|where|when|why|how)( (is|are|was|were|do|does|did|has|have|can|will))?( (an?|the))? ",
+    r"^(can|could|would|will) you (please )?",
+    r"^please ",
+    r"^i (want|need|would like) (to see )?",
+    r"^(generate|create|make|draw|design|show)( me)?( an?)?"
+    r"( (image|picture|visual|illustration|diagram|graphic|infographic))?( (of|showing|for|about|that shows))? ",
+    r" (looks?|look) like$",
+]
+ABBREVIATIONS = {" and ": " & ", " versus ": " vs ", " compared to ": " vs "}
+
+def compress_prompt_locally(prompt: str, max_length: int = 900):
+    """
+    Rule-based DALL-E spec for short queries: strip request filler and question
+    openers, extract keywords and fill a fixed [Style][Key Elements][Layout][Colors]
+    template. Returns None when the heuristics are not confident (too long, too few
+    keywords, or still an analytical question) and the LLM should be used.
+    """
+    text = " ".join(prompt.split())
+    if not text or len(text) > max_length or len(text.split()) > LOCAL_COMPRESSION_MAX_WORDS:
+        return None
+    if EXPLANATORY_QUESTION.match(text):
+        return None
+
+    subject = text.rstrip("?.! ")
+    for pattern in FILLER_PATTERNS:
+        subject = re.sub(pattern, "", subject, flags=re.I)
+    words = re.findall(r"[\w&'-]+", subject)
+    keywords = list(dict.fromkeys(w for w in words if w.lower() not in STOPWORDS))
+    if len(keywords) < LOCAL_COMPRESSION_MIN_KEYWORDS or ANALYTICAL_WORDS.search(subject):
+        return None
+
+    for long_form, short_form in ABBREVIATIONS.items():
+        subject = re.sub(re.escape(long_form), short_form, subject, flags=re.I)
+
+    spec = (
+        f"Flat infographic illustration of {subject}. "
+        f"Key elements: {', '.join(keywords[:8])}. "
+        "Clear central composition with labeled icons. "
+        "Vivid, high-contrast colors on a clean background."
+    )
+    return clean_prompt(spec, max_length)
 
 def analyze_prompt(prompt:str, max_length:int =900) -> str:
     """
-    Generates concise DALL-E 3 specs within character limits
+    Generates concise DALL-E 3 specs within character limits.
+    Uses the local compressor when it can, and memoizes the Mistral path otherwise.
     """
+    local_spec = compress_prompt_locally(prompt, max_length)
+    if local_spec is not None:
+        return local_spec
+
+    key = (" ".join(prompt.lower().split()), max_length)
+    cached = prompt_cache.get(key)
+    if cached is not None:
+        return cached
+    spec = _analyze_prompt_with_llm(prompt, max_length)
+    prompt_cache.set(key, spec)
+    return spec
+
+def _analyze_prompt_with_llm(prompt:str, max_length:int =900) -> str:
     compression_prompt = f"""Convert this query into DALL-E 3 specs STRICTLY under {max_length} chars:
     {prompt}
     
@@ -26,17 +132,19 @@ def analyze_prompt(prompt:str, max_length:int =900) -> str:
     3. Avoid markdown formatting
     4. Structure: [Style][Key Elements][Layout][Colors]
     """
-    response = mistral.chat.complete(
-        model="pixtral-12b-2409",
-        messages=[{
-            "role": "user",
-            "content": [{
-                "type": "text",
-                "text": compression_prompt
-            }]
-        }],
-        max_tokens=300
-    )
+    with trace_call("mistral", "chat") as call:
+        response = get_client("mistral").chat.complete(
+            model="pixtral-12b-2409",
+            messages=[{
+                "role": "user",
+                "content": [{
+                    "type": "text",
+                    "text": compression_prompt
+                }]
+            }],
+            max_tokens=300
+        )
+        record_openai_usage(call, response)
     generated = response.choices[0].message.content
     return clean_prompt(generated,max_length)
 
@@ -57,28 +165,39 @@ def clean_prompt(text:str,max_length:int) -> str:
     return text
 
 
-def generate_image_dalle(image_spec: str) -> Image.Image:
-    """Generate image using DALL-E 2 API"""
-    response = openai_client.images.generate(
-        model="dall-e-2",
-        prompt=image_spec,
-        size="1024x1024", 
-        quality="standard", 
-        style="vivid",     
-        n=1,
-        response_format="b64_json",
-    )
-    
-    # Download image from URL
-    for index, image_dict in enumerate(response.data):
-        image_data = b64decode(image_dict.b64_json)
-        image_file = f"image-{index}.png"
-        with open(image_file, mode="wb") as png:
-            png.write(image_data)
+def generate_image_dalle(image_spec: str) -> bytes:
+    """Generate image using DALL-E 2 API, returning the PNG bytes"""
+    with trace_call("openai", "images") as call:
+        response = get_client("openai").images.generate(
+            prompt=image_spec,
+            n=1,
+            response_format="b64_json",
+            **IMAGE_PARAMS
+        )
+        image = b64decode(response.data[0].b64_json)
+        call.set_bytes(len(image))
+    return image
 
-    print("Images Saved")
-    return
+def image_cache_key(image_spec: str) -> str:
+    payload = json.dumps({"prompt": image_spec, **IMAGE_PARAMS}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
 
-def image_agent(prompt: str):
+def image_agent(prompt: str) -> str:
+    """
+    Generate (or reuse) an image for the prompt and return a markdown reference
+    to it in the artifact store.
+    """
     refined_prompt = analyze_prompt(prompt)
-    return generate_image_dalle(refined_prompt)
\ No newline at end of file
+    key = image_cache_key(refined_prompt)
+
+    with _generation_lock(key):
+        name = artifact_store.get_alias(key)
+        if name is not None:
+            print("[IMAGE CACHE] hit, reusing generated image")
+        else:
+            name = artifact_store.put(generate_image_dalle(refined_prompt), "png")
+            artifact_store.set_alias(key, name)
+            print("Image Saved")
+
+    url = artifact_store.url(name)
+    return f"Generated image: {url}\n\n![Generated image]({url})"
@@ -1,16 +1,35 @@
 import os
+import base64
 import json
+import math
 import re
-import pandas as pd
-from openai import OpenAI
-from e2b_code_interpreter import Sandbox
 from dotenv import load_dotenv
-from utils.snowflake_connector import get_snowflake_connection
+from utils.snowflake_connector import snowflake_connection
+from utils.cache import TTLCache
+from utils.result_cache import result_cache
+from utils.duckdb_mirror import duckdb_mirror
+from utils.sql_templates import sql_from_template
+from utils.artifact_store import artifact_store
+from utils.telemetry import trace_call, record_openai_usage
+from utils.clients import get_client
 
 load_dotenv()
-
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 TABLE_NAME = "ON_SITE_SEARCH"
+# hard cap on rows pulled into the API worker; pushed down into the SQL as a LIMIT
+MAX_RESULT_ROWS = int(os.getenv("SNOWFLAKE_MAX_ROWS", "10000"))
+# only fall back to the remote E2B sandbox when no local chart template fits
+CHART_SANDBOX_FALLBACK = os.getenv("CHART_SANDBOX_FALLBACK", "true").lower() == "true"
+
+# NL-to-SQL cache: identical (normalized) questions skip the gpt-4o call entirely
+sql_cache = TTLCache(
+    "nl_to_sql",
+    max_size=int(os.getenv("SQL_CACHE_MAX_SIZE", "512")),
+    ttl_seconds=int(os.getenv("SQL_CACHE_TTL_SECONDS", "86400"))
+)
+# optional embedding lookup so near-identical phrasings also hit the cache
+SQL_CACHE_SIMILARITY = os.getenv("SQL_CACHE_SIMILARITY", "false").lower() == "true"
+SQL_CACHE_SIMILARITY_THRESHOLD = float(os.getenv("SQL_CACHE_SIMILARITY_THRESHOLD", "0.95"))
+EMBEDDING_MODEL = os.getenv("SQL_CACHE_EMBEDDING_MODEL", "text-embedding-3-small")
 
 def extract_json_block(text: str) -> str:
     """
@@ -31,7 +50,83 @@ def extract_json_block(text: str) -> str:
     raise ValueError("No valid JSON object found in the response.")
 
 
+def normalize_query(query: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace so trivial rephrasings share a key."""
+    return " ".join(re.sub(r"[^\w\s%-]", " ", query.lower()).split())
+
+
+def sql_cache_key(query: str, platform: str, date_start: str = None, date_end: str = None) -> tuple:
+    return (
+        normalize_query(query),
+        (platform or "").strip().lower(),
+        (date_start or "").strip(),
+        (date_end or "").strip()
+    )
+
+
+def _embed(text: str) -> list:
+    with trace_call("openai", "embeddings") as call:
+        response = get_client("openai").embeddings.create(model=EMBEDDING_MODEL, input=text)
+        record_openai_usage(call, response)
+    return response.data[0].embedding
+
+
+def _cosine(a: list, b: list) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+def _find_similar(key: tuple, embedding: list):
+    """Best cached entry with the same platform and dates whose question embedding is close enough."""
+    best, best_score = None, SQL_CACHE_SIMILARITY_THRESHOLD
+    for cached_key, entry in sql_cache.items():
+        if cached_key[1:] != key[1:] or entry["embedding"] is None:
+            continue
+        score = _cosine(embedding, entry["embedding"])
+        if score >= best_score:
+            best, best_score = entry, score
+    return best
+
+
 def generate_sql(query: str, platform: str, date_start: str = None, date_end: str = None) -> dict:
+    """
+    Translate a natural-language question into Snowflake SQL: recurring question types are filled
+    into a template locally, the rest is served from `sql_cache` or generated by the LLM.
+    """
+    templated = sql_from_template(query, platform, date_start, date_end)
+    if templated is not None:
+        print(f"[SQL TEMPLATE] {templated['intent']}")
+        return templated
+
+    key = sql_cache_key(query, platform, date_start, date_end)
+    cached = sql_cache.get(key)
+    if cached is not None:
+        print(f"[SQL CACHE] hit for {key}")
+        return dict(cached["result"])
+
+    embedding = None
+    if SQL_CACHE_SIMILARITY:
+        try:
+            embedding = _embed(key[0])
+            similar = _find_similar(key, embedding)
+            if similar is not None:
+                print(f"[SQL CACHE] similarity hit for {key}")
+                sql_cache.record_hit()
+                return dict(similar["result"])
+        except Exception as e:
+            print(f"[SQL CACHE] similarity lookup failed: {e}")
+
+    parsed = _generate_sql_with_llm(query, platform, date_start, date_end)
+    sql_cache.set(key, {"result": parsed, "embedding": embedding})
+    return dict(parsed)
+
+
+def sql_cache_stats() -> dict:
+    return sql_cache.stats()
+
+
+def _generate_sql_with_llm(query: str, platform: str, date_start: str = None, date_end: str = None) -> dict:
     system_prompt = f"""
 You are a Snowflake SQL expert.
 Generate a SQL query that runs on the table `{TABLE_NAME}` with these columns:
@@ -58,17 +153,21 @@ Output JSON in the format:
         {"role": "system", "content": system_prompt},
         {"role": "user", "content": query}
     ]
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=messages,
-        temperature=0
-    )
+    with trace_call("openai", "chat", purpose="sql") as call:
+        response = get_client("openai").chat.completions.create(
+            model="gpt-4o",
+            messages=messages,
+            temperature=0
+        )
+        record_openai_usage(call, response)
     content = response.choices[0].message.content.strip()
     json_text = extract_json_block(content)
     return json.loads(json_text)
 
 
-def run_e2b_chart_generator(df: pd.DataFrame, query: str) -> str:
+def run_e2b_chart_generator(df: "pd.DataFrame", query: str) -> str:
+    from e2b_code_interpreter import Sandbox
+
     col_names = ", ".join(df.columns)
     csv_data = df.to_csv(index=False)
 
@@ -89,13 +188,15 @@ Ensure the chart has a clear title, axis labels, and tight layout.
 Only return the code. Do not include explanations or comments.
 """
 
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {"role": "system", "content": prompt}
-        ],
-        temperature=0
-    )
+    with trace_call("openai", "chat", purpose="chart_code") as call:
+        response = get_client("openai").chat.completions.create(
+            model="gpt-4o",
+            messages=[
+                {"role": "system", "content": prompt}
+            ],
+            temperature=0
+        )
+        record_openai_usage(call, response)
 
     code_block = response.choices[0].message.content.strip()
 
@@ -116,9 +217,6 @@ print("DataFrame Head:", df.head())
 # LLM-Generated Code
 {code_block}
 
-print("Top Products Index:", top_products.index.tolist())
-print("X Tick Labels:", [label.get_text() for label in plt.gca().get_xticklabels()])
-
 plt.tight_layout()
 plt.savefig("chart.png")
 with open("chart.png", "rb") as f:
@@ -126,7 +224,8 @@ with open("chart.png", "rb") as f:
 print(encoded)
 """
         try:
-            result = sandbox.run_code(script)
+            with trace_call("e2b", "run_code"):
+                result = sandbox.run_code(script)
             for line in result.logs.stdout:
                 print(line)
         except Exception as e:
@@ -136,39 +235,119 @@ print(encoded)
     return result.logs.stdout[-1]
 
 
+_SQL_LITERAL_OR_COMMENT = re.compile(r"'(?:[^']|'')*'|--[^\n]*|/\*.*?\*/", re.DOTALL)
+_ROW_LIMIT_CLAUSE = re.compile(r"\bLIMIT\b|\bFETCH\s+(?:FIRST|NEXT)\b|\bTOP\s+\d", re.I)
+
+
+def _has_top_level_limit(sql: str) -> bool:
+    text = _SQL_LITERAL_OR_COMMENT.sub(" ", sql)
+    return any(text[:m.start()].count("(") == text[:m.start()].count(")") for m in _ROW_LIMIT_CLAUSE.finditer(text))
+
+
+def apply_row_limit(sql: str, max_rows: int = MAX_RESULT_ROWS) -> str:
+    """
+    Append `LIMIT max_rows + 1` to a SELECT that has no top-level row limit of its
+    own, so the warehouse stops early and the extra row tells us the result was
+    truncated. Appending (rather than wrapping in a subquery) keeps the query's
+    ORDER BY in force; other statements rely on the row cap in `run_query`.
+    """
+    statement = sql.strip().rstrip(";").rstrip()
+    if not re.match(r"\s*(?:SELECT|WITH)\b", statement, re.I) or _has_top_level_limit(statement):
+        return statement
+    # on its own line so a trailing line comment cannot swallow it
+    return f"{statement}\nLIMIT {max_rows + 1}"
+
+
+def run_query(sql: str, max_rows: int = MAX_RESULT_ROWS) -> "pd.DataFrame":
+    """
+    Execute sql and stream the result as Arrow batches into a single DataFrame,
+    stopping once max_rows + 1 rows have been read.
+    """
+    import pandas as pd
+    import pyarrow as pa
+    from snowflake.connector.errors import NotSupportedError
+
+    with snowflake_connection() as conn, trace_call("snowflake", "query") as call:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(sql)
+            columns = [col[0] for col in cursor.description]
+            batches, row_count = [], 0
+            try:
+                for batch in cursor.fetch_arrow_batches():
+                    batches.append(batch)
+                    row_count += batch.num_rows
+                    if row_count > max_rows:
+                        break
+            except NotSupportedError:
+                # result format is not Arrow (e.g. connector without pandas extras)
+                rows = cursor.fetchmany(max_rows + 1)
+                df = pd.DataFrame(rows, columns=columns)
+                call.set_bytes(int(df.memory_usage(deep=True).sum()))
+                return df
+            if not batches:
+                return pd.DataFrame(columns=columns)
+            table = pa.concat_tables(batches).slice(0, max_rows + 1)
+            call.set_bytes(table.nbytes)
+            return table.to_pandas()
+        finally:
+            cursor.close()
+
+
 def snowflake_tool(query: str, platform: str, date_start: str = None, date_end: str = None) -> dict:
+    # pandas and the chart engine load on first use, not when the API process starts
+    from utils.chart_engine import render_chart
+
     try:
         print(f"Received query: {query}")
         parsed = generate_sql(query, platform, date_start, date_end)
         sql = parsed.get("sql")
         print(f"Generated SQL: {sql}")
         explanation = parsed.get("explanation")
+        limited_sql = apply_row_limit(sql)
     except Exception as e:
         return {"error": f"Failed to generate SQL: {e}"}
 
-    try:
-        conn = get_snowflake_connection()
-        cursor = conn.cursor()
-        cursor.execute(sql)
-        rows = cursor.fetchall()
-        columns = [col[0] for col in cursor.description]
-        df = pd.DataFrame(rows, columns=columns)
-        cursor.close()
-        conn.close()
-    except Exception as e:
-        return {"error": f"Snowflake query failed: {e}", "sql": sql}
+    df = result_cache.get(limited_sql)
+    if df is not None:
+        print("[RESULT CACHE] hit, skipping Snowflake")
+    else:
+        # the local mirror answers when it covers the query's date range
+        df = duckdb_mirror.try_query(limited_sql)
+        if df is None:
+            try:
+                df = run_query(limited_sql)
+            except Exception as e:
+                return {"error": f"Snowflake query failed: {e}", "sql": sql}
+        result_cache.put(limited_sql, df)
 
     if df.empty:
         return {"summary": "Query executed but returned no data."}
 
-    try:
-        chart_base64 = run_e2b_chart_generator(df, query)
-    except Exception as e:
-        chart_base64 = None
+    truncated = len(df) > MAX_RESULT_ROWS
+    if truncated:
+        df = df.iloc[:MAX_RESULT_ROWS]
+
+    chart_base64 = render_chart(df, query)
+    if chart_base64 is None and CHART_SANDBOX_FALLBACK:
+        try:
+            chart_base64 = run_e2b_chart_generator(df, query)
+        except Exception as e:
+            chart_base64 = None
+
+    # keep only a short URL in the graph state; the PNG itself goes to the artifact store
+    chart_url = None
+    if chart_base64:
+        try:
+            chart_url = artifact_store.url(artifact_store.put(base64.b64decode(chart_base64.strip()), "png"))
+        except Exception as e:
+            print(f"Failed to store chart artifact: {e}")
 
     return {
         "summary": explanation,
         "data_preview": df.head(5).to_dict(orient="records"),
-        "chart_base64": chart_base64,
-        "sql": sql
+        "chart_url": chart_url,
+        "sql": sql,
+        "row_count": len(df),
+        "truncated": truncated
     }
\ No newline at end of file
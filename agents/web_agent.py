@@ -1,46 +1,25 @@
 from dotenv import load_dotenv
-from tavily import TavilyClient
-from bs4 import BeautifulSoup
-import requests
 import os
-from langchain_community.chat_models import ChatOllama
+from concurrent.futures import ThreadPoolExecutor
+from utils.scraper import scrape_engine
+from utils.search_cache import cached_search
+from utils.article_corpus import article_corpus
+from utils.dedup import dedupe_results
+from utils.clients import get_client
 
 load_dotenv()
 
-tavily_api_key = os.getenv("TAVILY_API_KEY")
-client = TavilyClient(api_key=tavily_api_key)
+# start the YouTube fallback search alongside the main search instead of after it. This saves one search
+# round trip when the main results have no videos, but every cache miss then pays for a second advanced
+# Tavily search, even when the main results already contain videos and the prefetched one is thrown away.
+YOUTUBE_PREFETCH = os.getenv("YOUTUBE_PREFETCH", "false").lower() == "true"
+_search_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="tavily")
 
-def extract_relevant_images(page_url, max_images=3):
-    try:
-        headers = {'User-Agent': 'Mozilla/5.0'}
-        response = requests.get(page_url, headers=headers, timeout=5)
-        soup = BeautifulSoup(response.text, "html.parser")
-        images = []
-        for img in soup.find_all("img"):
-            src = img.get("src", "")
-            alt = img.get("alt", "").lower()
-            if not src or src.startswith("data:"):
-                continue
-            if any(kw in alt for kw in ["logo", "icon", "header"]):
-                continue
-            if src.startswith("//"):
-                src = "https:" + src
-            elif src.startswith("/"):
-                from urllib.parse import urljoin
-                src = urljoin(page_url, src)
-            images.append((src, alt))
-            if len(images) >= max_images:
-                break
-        return images
-    except Exception as e:
-        print(f"Image scrape failed from {page_url}: {e}")
-        return []
-    
 def fetch_youtube_links(query: str, max_results: int = 5):
     """Performs a dedicated YouTube-only search using Tavily."""
     yt_query = f"{query} site:youtube.com"
     try:
-        yt_response = client.search(query=yt_query, max_results=max_results, search_depth="advanced")
+        yt_response = cached_search(get_client("tavily"), yt_query, max_results=max_results, search_depth="advanced")
         links = []
         for result in yt_response["results"]:
             title = result["title"]
@@ -53,35 +32,24 @@ def fetch_youtube_links(query: str, max_results: int = 5):
         return []
 
 
-def web_search_tool(query: str):
-    """
-    Performs a grouped search with:
-    - YouTube links (guaranteed via secondary search if needed)
-    - Article blocks (text + images from the same article)
-    """
-    time_filtered_query = f"{query} after:2022-01-01 before:2022-07-01"
-    response = client.search(query=time_filtered_query, search_depth="advanced", max_results=10)
+def _is_youtube(url: str) -> bool:
+    return "youtube.com" in url or "youtu.be" in url
 
-    article_blocks = []
-    youtube_links = []
 
-    for x in response["results"]:
-        title = x["title"]
-        content = x["content"]
-        url = x["url"]
+def _article_block(title: str, content: str, url: str, images: list, duplicate_urls: list = None) -> str:
+    image_tags = []
+    for img_url, alt_text in images:
+        image_tags.append(f"![{alt_text or 'Image'}]({img_url})")
 
-        if "youtube.com" in url or "youtu.be" in url:
-            youtube_links.append(f"- [{title}]({url})")
-            continue
+    # 🔧 FIX: Move join logic outside the f-string
+    image_block = "\n".join(image_tags) if image_tags else ""
 
-        image_tags = []
-        for img_url, alt_text in extract_relevant_images(url):
-            image_tags.append(f"![{alt_text or 'Image'}]({img_url})")
+    # near-duplicate copies of this article keep their place in the sources
+    also_reported = ""
+    if duplicate_urls:
+        also_reported = "Also reported by: " + ", ".join(f"[{u}]({u})" for u in duplicate_urls)
 
-        # 🔧 FIX: Move join logic outside the f-string
-        image_block = "\n".join(image_tags) if image_tags else ""
-
-        article_block = f"""
+    return f"""
     ### {title}
 
     {content}
@@ -89,16 +57,11 @@ def web_search_tool(query: str):
     {image_block}
 
     🔗 [Visit Source]({url})
+    {also_reported}
     """.strip()
 
-        article_blocks.append(article_block)
-
-    # Ensure YouTube links are present — fallback if missing
-    if not youtube_links:
-        print("No YouTube links found in main results — running fallback search...")
-        youtube_links = fetch_youtube_links(query)
 
-    # Final output assembly
+def _assemble_output(youtube_links: list, article_blocks: list) -> str:
     final_output = []
 
     if youtube_links:
@@ -109,4 +72,67 @@ def web_search_tool(query: str):
     if article_blocks:
         final_output.append("## Article Summaries with Images\n" + "\n\n---\n\n".join(article_blocks))
 
-    return "\n\n".join(final_output)
\ No newline at end of file
+    return "\n\n".join(final_output)
+
+
+def _answer_from_corpus(query: str):
+    """Render a web_search_tool answer from the local corpus, or None when it is not good enough."""
+    hits = article_corpus.lookup(query)
+    if hits is None:
+        return None
+    print(f"Answering '{query}' from the local article corpus ({len(hits)} hits)")
+    youtube_links = [f"- [{h['title']}]({h['url']})" for h in hits if h["kind"] == "youtube"]
+    article_blocks = [
+        _article_block(h["title"], h["content"], h["url"], h["images"], h["duplicate_urls"])
+        for h in dedupe_results([h for h in hits if h["kind"] == "article"])
+    ]
+    if not youtube_links:
+        youtube_links = fetch_youtube_links(query)
+    return _assemble_output(youtube_links, article_blocks)
+
+
+def web_search_tool(query: str):
+    """
+    Performs a grouped search with:
+    - YouTube links (guaranteed via secondary search if needed)
+    - Article blocks (text + images from the same article)
+    Recurring topics are answered from the local article corpus before calling Tavily.
+    """
+    local_answer = _answer_from_corpus(query)
+    if local_answer is not None:
+        return local_answer
+
+    youtube_future = _search_executor.submit(fetch_youtube_links, query) if YOUTUBE_PREFETCH else None
+
+    time_filtered_query = f"{query} after:2022-01-01 before:2022-07-01"
+    response = cached_search(get_client("tavily"), time_filtered_query, search_depth="advanced", max_results=10)
+
+    article_blocks = []
+    youtube_links = []
+
+    for x in response["results"]:
+        if _is_youtube(x["url"]):
+            youtube_links.append(f"- [{x['title']}]({x['url']})")
+            article_corpus.add(x["title"], x["content"], x["url"], kind="youtube")
+
+    # collapse syndicated copies before scraping and before they reach the LLM
+    articles = dedupe_results([x for x in response["results"] if not _is_youtube(x["url"])])
+
+    # scrape every article page at once instead of one after another
+    images_by_url = scrape_engine.scrape_images([x["url"] for x in articles])
+
+    for x in articles:
+        title = x["title"]
+        content = x["content"]
+        url = x["url"]
+        images = images_by_url.get(url, [])
+        article_blocks.append(_article_block(title, content, url, images, x["duplicate_urls"]))
+        article_corpus.add(title, content, url, images, duplicate_urls=x["duplicate_urls"])
+
+    # Ensure YouTube links are present — fallback if missing
+    if not youtube_links:
+        print("No YouTube links found in main results — using fallback search...")
+        youtube_links = youtube_future.result() if youtube_future else fetch_youtube_links(query)
+
+    # Final output assembly
+    return _assemble_output(youtube_links, article_blocks)
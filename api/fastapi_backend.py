@@ -1,52 +1,204 @@
+import asyncio
+import mimetypes
+import os
 from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import JSONResponse, StreamingResponse, Response
 from langgraph_code.langgraph_flow import runnable
-from utils.report_util import generate_structured_summary_from_logs
-import time
+from agents.final_report_agent import astream_final_report, assemble_sections, REPORT_SECTIONS
+from utils.report_util import final_report_from_state, report_from_graph, extract_report_fields, EMPTY_REPORT_FIELDS
+from utils.job_store import JobStore, public_view
+from utils.streaming import stream_graph_events, format_sse
+from utils.cache import TTLCache, cache_stats
+from utils.artifact_store import artifact_store
+from utils.telemetry import metrics_payload, span
 
 # initialize the FastAPI app
 app = FastAPI()
 
+jobs = JobStore()
+
+# finished reports per normalized query; identical in-flight queries share one graph run
+response_cache = TTLCache(
+    "query_responses",
+    max_size=int(os.getenv("QUERY_CACHE_MAX_SIZE", "128")),
+    ttl_seconds=int(os.getenv("QUERY_CACHE_TTL_SECONDS", "900"))
+)
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
 @app.get("/")
 def read_root():
     return {"message": "Welcome to the Report Generation API!"}
 
-@app.post("/use-all-agents/")
+
+@app.get("/cache/stats")
+def get_cache_stats():
+    """Hit/miss counters for the in-process caches."""
+    return cache_stats()
+
+
+@app.get("/metrics")
+def get_metrics():
+    """Prometheus metrics: node and external call latencies, token usage, payload sizes, cache hits, errors."""
+    body, content_type = metrics_payload()
+    return Response(content=body, media_type=content_type)
+
+
+@app.delete("/cache/queries")
+def invalidate_query_cache(query: str = None):
+    """Drop the cached report for one query, or for every query when none is given."""
+    response_cache.invalidate(normalize_query(query) if query else None)
+    return {"invalidated": query or "all"}
+
+
+@app.get("/artifacts/{name}")
+def get_artifact(name: str):
+    """Serve charts and images referenced by URL in generated reports."""
+    data = artifact_store.get(name)
+    if data is None:
+        raise HTTPException(status_code=404, detail=f"Unknown artifact: {name}")
+    media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    return Response(content=data, media_type=media_type, headers={"Cache-Control": "public, max-age=31536000, immutable"})
+
+
+async def run_all_agents(job: dict) -> str:
+    """
+    Run the multiagent graph for a job without blocking the event loop.
+    """
+    state = {
+        "input": job["query"],
+        "chat_history": [],
+        "intermediate_steps": []
+    }
+    with span("research_request", job_id=job["job_id"], query=job["query"]):
+        result = await runnable.ainvoke(state)
+        # the fallback report generation is a synchronous LLM call, keep it off the event loop
+        report = await asyncio.to_thread(final_report_from_state, result)
+    response_cache.set(job["key"], report)
+    return report
+
+
+@app.post("/use-all-agents/", status_code=202)
 async def use_all_agents(query: str):
     """
     Endpoint to use all agents combined via the multiagent graph.
+    Returns a job ID immediately; poll /jobs/{job_id} and fetch
+    /jobs/{job_id}/result once the job has completed.
+    Cached queries complete at once, and a query identical to one already
+    running is attached to that job instead of starting another graph run.
+    """
+    key = normalize_query(query)
+    cached = response_cache.get(key)
+    if cached is not None:
+        job = jobs.create(query, key=key)
+        jobs.complete(job, cached)
+        return public_view(job)
+
+    job = jobs.find_in_flight(key)
+    if job is None:
+        job = jobs.create(query, key=key)
+        jobs.submit(job, run_all_agents)
+    return public_view(job)
+
+
+@app.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return public_view(job)
+
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    if job["status"] == "failed":
+        raise HTTPException(status_code=500, detail=f"Error invoking multiagent system: {job['error']}")
+    if job["status"] != "completed":
+        return JSONResponse(status_code=202, content=public_view(job))
+    return {"query": job["query"], "result": job["result"]}
+
+
+REPORT_SECTION_ORDER = [field for field, _, _ in REPORT_SECTIONS] + ["sources"]
+
+
+async def stream_research(job: dict) -> str:
+    """
+    Run the graph for a streaming job, publishing progress and report tokens as
+    SSE events on the job so every request attached to it can relay them.
     """
     state = {
-        "input": query,
+        "input": job["query"],
         "chat_history": [],
         "intermediate_steps": []
     }
+    with span("research_request", job_id=job["job_id"], query=job["query"]):
+        final_state = None
+        async for event, payload in stream_graph_events(runnable, state):
+            if event == "graph_end":
+                final_state = payload
+                break
+            if event == "node_start" and payload["node"] == "final_report_tool":
+                jobs.publish(job, "report_start", {"sections": REPORT_SECTION_ORDER})
+            jobs.publish(job, event, payload)
 
+        report = report_from_graph(final_state)
+        if report is None:
+            # graph ended without a report: extract the fields and stream a fresh one
+            jobs.publish(job, "report_start", {"sections": REPORT_SECTION_ORDER})
+            fields = await asyncio.to_thread(extract_report_fields, final_state)
+            section_texts = {}
+            async for section, token in astream_final_report(**{**EMPTY_REPORT_FIELDS, **fields}):
+                section_texts[section] = section_texts.get(section, "") + token
+                jobs.publish(job, "token", {"text": token, "section": section})
+            report = assemble_sections(section_texts)
+    response_cache.set(job["key"], report)
+    return report
+
+
+async def stream_all_agents(query: str):
+    """
+    Yield server-sent events for one research run: graph progress first, then
+    the final report token by token, then a closing `done` event.
+    The run is a keyed job, so identical concurrent streams and POSTs share it.
+    """
     try:
-        result = runnable.invoke(state)
-        time.sleep(60)
-        final_output = generate_structured_summary_from_logs(result)
-        return {"query": query, "result": final_output}
+        key = normalize_query(query)
+        cached = response_cache.get(key)
+        if cached is not None:
+            yield format_sse("done", {"query": query, "result": cached, "cached": True})
+            return
+
+        job = jobs.find_in_flight(key)
+        if job is None:
+            job = jobs.create(query, key=key)
+            jobs.submit(job, stream_research)
+        else:
+            # an identical query is already running: relay its events instead of re-running the graph
+            yield format_sse("coalesced", {"job_id": job["job_id"]})
+
+        async for event, payload in jobs.follow(job):
+            yield format_sse(event, payload)
+        await jobs.wait(job)
+        if job["status"] == "failed":
+            raise RuntimeError(job["error"])
+        yield format_sse("done", {"query": query, "result": job["result"]})
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error invoking multiagent system: {str(e)}")
-
-    # try:
-    #     result = runnable.invoke(state)
-    #     max_retries = 2  # Total attempts = initial + 2 retries
-    #     retry_delay = 5  # Seconds between attempts
-    #     final_output = None
-    #     for attempt in range(max_retries + 1):
-    #         try:
-    #             final_output = generate_structured_summary_from_logs(result)
-    #             break
-    #         except Exception as e:
-    #             if attempt == max_retries:
-    #                 raise
-    #             time.sleep(retry_delay)
-    #             continue
-    #     return {"query": query, "result": final_output}
-    # except Exception as e:
-    #     raise HTTPException(
-    #         status_code=500,
-    #         detail=f"Failed after {max_retries} retries: {str(e)}"
-    #     )    
-		
\ No newline at end of file
+        yield format_sse("error", {"detail": f"Error invoking multiagent system: {str(e)}"})
+
+
+@app.get("/use-all-agents/stream")
+async def use_all_agents_stream(query: str):
+    """
+    Same pipeline as /use-all-agents/, streamed to the client as server-sent events.
+    """
+    return StreamingResponse(
+        stream_all_agents(query),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,314 @@
+"""
+Local stand-ins for every external service the pipeline talks to, so the graph
+and the API can be exercised offline with controllable latency.
+"""
+import base64
+import json
+import random
+import re
+import sqlite3
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+# 1x1 transparent PNG returned by the fake image API
+TINY_PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII="
+)
+REPORT_FIELDS = [
+    "executive_summary", "market_overview", "internal_insights",
+    "quantitative_analysis", "recommendations", "sources",
+]
+PLATFORMS = ["amazon.com", "walmart.com", "target.com", "bestbuy.com"]
+KEYWORDS = [
+    "running shoes", "air fryer", "wireless earbuds", "yoga mat", "standing desk", "protein powder",
+    "phone case", "gaming chair", "robot vacuum", "water bottle", "led strip lights", "air purifier",
+]
+
+
+def _text_response(words: int) -> str:
+    return " ".join(random.choice(KEYWORDS).split()[0] for _ in range(words))
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Chat model with scripted behaviour and simulated latency.
+
+    - bound to tools (the oracle): first turn fans out to the data tools,
+      the next turn calls final_report_tool
+    - asked for the six report fields as JSON (report_util): returns that JSON
+    - anything else (report sections): returns `response_words` words of text
+    """
+
+    latency: float = 0.2
+    response_words: int = 200
+    stream_chunks: int = 20
+    first_turn_tools: list = ["snowflake_tool", "web_search_tool", "image_generator_tool"]
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _respond(self, messages) -> AIMessage:
+        prompt = messages[-1].content if messages else ""
+        if any(getattr(m, "type", "") == "system" and "oracle" in m.content for m in messages):
+            if "Tool:" not in prompt:
+                calls = [
+                    {"name": name, "args": self._tool_args(name, messages), "id": f"call_{i}"}
+                    for i, name in enumerate(self.first_turn_tools)
+                ]
+            else:
+                args = {field: f"{field} from the scratchpad: {prompt[:200]}" for field in REPORT_FIELDS}
+                calls = [{"name": "final_report_tool", "args": args, "id": "call_report"}]
+            return AIMessage(content="", tool_calls=calls)
+        if "produce a JSON object" in prompt:
+            return AIMessage(content=json.dumps({field: _text_response(40) for field in REPORT_FIELDS}))
+        return AIMessage(content=_text_response(self.response_words))
+
+    def _tool_args(self, name: str, messages) -> dict:
+        user = next((m.content for m in messages if getattr(m, "type", "") == "human"), "")
+        if name == "snowflake_tool":
+            return {"query": user, "platform": "amazon", "date_start": "2023-01-01", "date_end": "2023-12-31"}
+        return {"query": user}
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        message = self._respond(messages)
+        if message.tool_calls:
+            time.sleep(self.latency)
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[
+                {"name": c["name"], "args": json.dumps(c["args"]), "id": c["id"], "index": i}
+                for i, c in enumerate(message.tool_calls)
+            ]))
+            return
+        words = message.content.split(" ")
+        step = max(len(words) // self.stream_chunks, 1)
+        for i in range(0, len(words), step):
+            time.sleep(self.latency / self.stream_chunks)
+            text = " ".join(words[i:i + step]) + " "
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=text))
+            if run_manager:
+                run_manager.on_llm_new_token(text, chunk=chunk)
+            yield chunk
+
+
+class FakeOpenAIClient:
+    """Implements the slices of `openai.OpenAI` used by the agents: chat, embeddings, images."""
+
+    def __init__(self, latency: float = 0.2):
+        self.latency = latency
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._chat))
+        self.embeddings = SimpleNamespace(create=self._embed)
+        self.images = SimpleNamespace(generate=self._image)
+
+    def _chat(self, model=None, messages=None, **kwargs):
+        time.sleep(self.latency)
+        system = messages[0]["content"] if messages else ""
+        platform = re.search(r"SITE_RULE ILIKE '%(.*?)%'", system)
+        dates = re.search(r"DATE BETWEEN '(.*?)' AND '(.*?)'", system)
+        sql = (
+            "SELECT OSS_KEYWORD, SUM(CALIBRATED_VISITS) AS TOTAL_VISITS FROM ON_SITE_SEARCH "
+            f"WHERE COUNTRY = 840 AND SITE_RULE ILIKE '%{platform.group(1) if platform else 'amazon'}%' "
+            f"AND DATE BETWEEN '{dates.group(1) if dates else '2023-01-01'}' AND '{dates.group(2) if dates else '2023-12-31'}' "
+            "GROUP BY OSS_KEYWORD ORDER BY TOTAL_VISITS DESC LIMIT 10"
+        )
+        content = "```json\n" + json.dumps({"sql": sql, "explanation": "Top keywords by visits."}) + "\n```"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+    def _embed(self, model=None, input=None, **kwargs):
+        time.sleep(self.latency / 4)
+        rng = random.Random(input)
+        return SimpleNamespace(data=[SimpleNamespace(embedding=[rng.random() for _ in range(64)])])
+
+    def _image(self, prompt=None, **kwargs):
+        time.sleep(self.latency * 2)
+        # vary the bytes per prompt so the content-addressed store sees distinct images
+        payload = TINY_PNG + prompt.encode("utf-8")[:32]
+        return SimpleNamespace(data=[SimpleNamespace(b64_json=base64.b64encode(payload).decode())])
+
+
+class FakeMistral:
+    def __init__(self, latency: float = 0.2):
+        self.latency = latency
+        self.chat = SimpleNamespace(complete=self._complete)
+
+    def _complete(self, model=None, messages=None, **kwargs):
+        time.sleep(self.latency)
+        text = "Flat illustration, key products, grid layout, vivid colors."
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+
+class FakeTavily:
+    """Search results pointing at the local page server, including one syndicated duplicate."""
+
+    def __init__(self, page_base_url: str, latency: float = 0.3, results: int = 8):
+        self.page_base_url = page_base_url
+        self.latency = latency
+        self.results = results
+        self.calls = 0
+
+    def search(self, query: str, max_results: int = 10, **kwargs):
+        time.sleep(self.latency)
+        self.calls += 1
+        if "site:youtube.com" in query:
+            return {"results": [
+                {"title": f"{query} video {i}", "url": f"https://www.youtube.com/watch?v={i}", "content": query, "score": 0.5}
+                for i in range(3)
+            ]}
+        results = []
+        for i in range(min(self.results, max_results)):
+            body = f"Article {i} about {query}. " + " ".join(random.Random(i).sample(KEYWORDS * 4, 40))
+            results.append({"title": f"{query} article {i}", "url": f"{self.page_base_url}/article/{i}",
+                            "content": body, "score": 1 - i / 20})
+        # a syndicated copy of the first article on another host
+        results.append({**results[0], "url": f"{self.page_base_url}/syndicated/0", "score": 0.1})
+        return {"results": results}
+
+
+class FakeSnowflakeCursor:
+    def __init__(self, conn, latency):
+        self._conn = conn
+        self._latency = latency
+        self._cursor = conn.cursor()
+        self.description = None
+
+    def execute(self, sql: str):
+        time.sleep(self._latency)
+        # SQLite has no ILIKE; its LIKE is already case-insensitive for ASCII
+        self._cursor.execute(re.sub(r"\bILIKE\b", "LIKE", sql, flags=re.I))
+        self.description = self._cursor.description
+        return self
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchmany(self, size: int):
+        return self._cursor.fetchmany(size)
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def fetch_arrow_batches(self, batch_size: int = 1000):
+        import pyarrow as pa
+        columns = [col[0] for col in self.description]
+        while True:
+            rows = self._cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield pa.Table.from_pylist([dict(zip(columns, row)) for row in rows])
+
+    def close(self):
+        self._cursor.close()
+
+
+class FakeSnowflakeConnection:
+    def __init__(self, db_path: str, latency: float):
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._latency = latency
+        self._closed = False
+
+    def cursor(self):
+        return FakeSnowflakeCursor(self._conn, self._latency)
+
+    def is_closed(self) -> bool:
+        return self._closed
+
+    def close(self):
+        self._closed = True
+        self._conn.close()
+
+
+class FakeSnowflake:
+    """
+    SQLite database holding an ON_SITE_SEARCH-shaped table. `connect()` mimics
+    snowflake.connector.connect, including a simulated connect (auth/warehouse) cost.
+    """
+
+    def __init__(self, db_path: str, connect_latency: float = 0.5, query_latency: float = 0.1,
+                 days: int = 365, start: date = date(2023, 1, 1)):
+        self.db_path = db_path
+        self.connect_latency = connect_latency
+        self.query_latency = query_latency
+        self.connects = 0
+        self._lock = threading.Lock()
+        self._populate(days, start)
+
+    def _populate(self, days: int, start: date):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("DROP TABLE IF EXISTS ON_SITE_SEARCH")
+        conn.execute(
+            "CREATE TABLE ON_SITE_SEARCH (DATE TEXT, OSS_KEYWORD TEXT, SITE_RULE TEXT,"
+            " CALIBRATED_VISITS REAL, CALIBRATED_USERS REAL, COUNTRY INTEGER)"
+        )
+        rng = random.Random(0)
+        rows = []
+        for d in range(days):
+            day = (start + timedelta(days=d)).isoformat()
+            for site in PLATFORMS:
+                for keyword in KEYWORDS:
+                    visits = rng.randint(100, 10000)
+                    rows.append((day, keyword, site, visits, visits * 0.7, 840))
+        conn.executemany("INSERT INTO ON_SITE_SEARCH VALUES (?, ?, ?, ?, ?, ?)", rows)
+        conn.commit()
+        conn.close()
+
+    def connect(self, **kwargs):
+        time.sleep(self.connect_latency)
+        with self._lock:
+            self.connects += 1
+        return FakeSnowflakeConnection(self.db_path, self.query_latency)
+
+
+class _PageHandler(BaseHTTPRequestHandler):
+    latency = 0.2
+    filler_bytes = 200 * 1024
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        filler = "<p>" + "lorem ipsum " * (self.filler_bytes // 12) + "</p>"
+        body = (
+            "<html><head><title>page</title></head><body>"
+            '<img src="/static/logo.png" alt="Site logo">'
+            f'<img src="/static{self.path}/hero.jpg" alt="Hero image">'
+            f"{filler}"
+            f'<img src="/static{self.path}/chart.png" alt="Market chart">'
+            f'<img src="//cdn.example.com{self.path}/product.jpg" alt="Product">'
+            "</body></html>"
+        ).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # streaming parser stopped reading early
+
+    def log_message(self, *args):
+        pass
+
+
+class PageServer:
+    """Local HTTP server serving article pages for the image scraper."""
+
+    def __init__(self, latency: float = 0.2, filler_bytes: int = 200 * 1024):
+        handler = type("PageHandler", (_PageHandler,), {"latency": latency, "filler_bytes": filler_bytes})
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self._server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self._server.shutdown()
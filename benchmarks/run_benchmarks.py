@@ -0,0 +1,297 @@
+"""
+Offline benchmark for the research pipeline.
+
+Every external dependency (OpenAI, Mistral, Tavily, Snowflake, E2B and the
+scraped web pages) is replaced by a local stand-in from benchmarks/fakes.py with
+a fixed, configurable latency, so runs are reproducible and cost nothing.
+
+Measured:
+- graph.cold: end-to-end and per-node latency of the compiled graph, caches cleared
+- graph.warm: the same query repeated, so the caches are exercised
+- graph.memory: peak traced Python memory of one cold run
+- startup: time to import the API module in a fresh interpreter
+- api: throughput and job latency of POST /use-all-agents/ under concurrency
+- api.memory: peak traced Python memory of the same concurrent jobs, in a separate pass
+
+    python -m benchmarks.run_benchmarks                  # compare with baselines.json
+    python -m benchmarks.run_benchmarks --save-baseline  # record new baselines
+
+Exits with status 1 when a metric regresses by more than --tolerance.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASE_QUERY = "What are the most searched products on Amazon in 2023?"
+# metrics where a higher value is better; everything else is a latency or a size
+HIGHER_IS_BETTER = {"api.throughput_jobs_per_s"}
+# latency changes smaller than this are scheduling noise, whatever their relative size
+NOISE_FLOOR_MS = 50
+
+
+def configure_environment(workdir: str, args) -> None:
+    """Point every on-disk cache at `workdir` and disable paid fallbacks. Must run before app imports."""
+    os.environ.update({
+        "OPENAI_API_KEY": "bench",
+        "MISTRAL_API_KEY": "bench",
+        "TAVILY_API_KEY": "bench",
+        "E2B_API_KEY": "bench",
+        "CHART_SANDBOX_FALLBACK": "false",
+        "RESULT_CACHE_DIR": os.path.join(workdir, "results"),
+        "ARTIFACT_DIR": os.path.join(workdir, "artifacts"),
+        "SEARCH_CACHE_PATH": os.path.join(workdir, "search_cache.sqlite3"),
+        "ARTICLE_CORPUS_PATH": os.path.join(workdir, "article_corpus.sqlite3"),
+        "DUCKDB_MIRROR_DIR": os.path.join(workdir, "mirror"),
+        "MAX_CONCURRENT_JOBS": str(args.concurrency),
+    })
+
+
+def install_fakes(workdir: str, args) -> dict:
+    """Register the local stand-ins in the shared client registry."""
+    from benchmarks.fakes import (
+        ScriptedChatModel, FakeOpenAIClient, FakeMistral, FakeTavily, FakeSnowflake, PageServer
+    )
+    import snowflake.connector
+    from utils.clients import set_client
+
+    chat = ScriptedChatModel(latency=args.llm_latency)
+    pages = PageServer(latency=args.http_latency)
+    fakes = {
+        "chat": chat,
+        "openai": FakeOpenAIClient(latency=args.llm_latency),
+        "mistral": FakeMistral(latency=args.llm_latency),
+        "tavily": FakeTavily(pages.base_url, latency=args.search_latency),
+        "snowflake": FakeSnowflake(os.path.join(workdir, "snowflake.sqlite3"),
+                                   connect_latency=args.connect_latency, query_latency=args.query_latency),
+        "pages": pages,
+    }
+
+    set_client("chat", chat)
+    set_client("openai", fakes["openai"])
+    set_client("mistral", fakes["mistral"])
+    set_client("tavily", fakes["tavily"])
+    snowflake.connector.connect = fakes["snowflake"].connect
+    if args.mirror:
+        from datetime import date
+        from utils.duckdb_mirror import duckdb_mirror
+        duckdb_mirror.sync(date(2023, 1, 1), date(2023, 12, 31))
+    return fakes
+
+
+def unique_query() -> str:
+    # two fresh tokens keep the query below the article corpus coverage threshold
+    token = uuid.uuid4().hex
+    return f"{BASE_QUERY} ({token[:8]} {token[8:16]})"
+
+
+def initial_state(query: str) -> dict:
+    return {"input": query, "chat_history": [], "intermediate_steps": [], "step_digests": []}
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def summarize(prefix: str, values: list) -> dict:
+    return {
+        f"{prefix}_p50_ms": round(statistics.median(values), 1),
+        f"{prefix}_p95_ms": round(percentile(values, 95), 1),
+    }
+
+
+async def timed_graph_run(runnable, query: str) -> tuple:
+    """One graph run; returns (end-to-end ms, {node: [duration ms, ...]})."""
+    from utils.streaming import stream_graph_events
+    nodes = {}
+    start = time.perf_counter()
+    async for event, payload in stream_graph_events(runnable, initial_state(query)):
+        if event == "node_end" and payload["duration_ms"] is not None:
+            nodes.setdefault(payload["node"], []).append(payload["duration_ms"])
+    return (time.perf_counter() - start) * 1000, nodes
+
+
+async def bench_graph(runnable, runs: int, cold: bool) -> dict:
+    from utils.result_cache import result_cache
+    prefix = "graph.cold" if cold else "graph.warm"
+    totals, per_node = [], {}
+    if not cold:
+        await timed_graph_run(runnable, BASE_QUERY)  # populate the caches
+    for _ in range(runs):
+        if cold:
+            result_cache.clear()
+        total, nodes = await timed_graph_run(runnable, unique_query() if cold else BASE_QUERY)
+        totals.append(total)
+        for node, durations in nodes.items():
+            per_node.setdefault(node, []).extend(durations)
+
+    metrics = summarize(f"{prefix}.e2e", totals)
+    for node, durations in sorted(per_node.items()):
+        metrics[f"{prefix}.node.{node}_p50_ms"] = round(statistics.median(durations), 1)
+    return metrics
+
+
+async def bench_memory(runnable) -> dict:
+    from utils.result_cache import result_cache
+    result_cache.clear()
+    tracemalloc.start()
+    try:
+        await timed_graph_run(runnable, unique_query())
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"graph.memory.peak_mb": round(peak / 2 ** 20, 1)}
+
+
+def bench_startup(runs: int) -> dict:
+    """Median wall time to import the API module in a fresh interpreter (what a new worker pays)."""
+    code = "import time; t = time.perf_counter(); import api.fastapi_backend; print(time.perf_counter() - t)"
+    timings = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, env=os.environ,
+                             capture_output=True, text=True, check=True)
+        timings.append(float(out.stdout.strip().splitlines()[-1]) * 1000)
+    return {"startup.import_p50_ms": round(statistics.median(timings), 1)}
+
+
+async def run_api_jobs(concurrency: int):
+    """Submit `concurrency` jobs at once and poll them to completion; returns per-job latencies and wall time."""
+    import httpx
+    from api.fastapi_backend import app
+
+    async def one_job(client) -> float:
+        start = time.perf_counter()
+        response = await client.post("/use-all-agents/", params={"query": unique_query()})
+        job_id = response.json()["job_id"]
+        while True:
+            job = (await client.get(f"/jobs/{job_id}")).json()
+            if job["status"] in ("completed", "failed"):
+                if job["status"] == "failed":
+                    raise RuntimeError(f"benchmark job failed: {job['error']}")
+                return (time.perf_counter() - start) * 1000
+            await asyncio.sleep(0.02)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(one_job(client) for _ in range(concurrency)))
+        wall = time.perf_counter() - start
+    return latencies, wall
+
+
+async def bench_api(concurrency: int) -> dict:
+    latencies, wall = await run_api_jobs(concurrency)
+    metrics = summarize("api.job", latencies)
+    metrics["api.throughput_jobs_per_s"] = round(concurrency / wall, 2)
+    return metrics
+
+
+async def bench_api_memory(concurrency: int) -> dict:
+    """Peak traced memory of concurrent API jobs, in its own pass so tracing does not skew the api latencies."""
+    from utils.result_cache import result_cache
+    result_cache.clear()
+    tracemalloc.start()
+    try:
+        await run_api_jobs(concurrency)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"api.memory.peak_mb": round(peak / 2 ** 20, 1)}
+
+
+def compare(metrics: dict, baseline: dict, tolerance: float) -> list:
+    """Metrics that are worse than the baseline by more than `tolerance` (a fraction)."""
+    regressions = []
+    for name, value in metrics.items():
+        reference = baseline.get(name)
+        if not reference:
+            continue
+        change = (value - reference) / reference
+        if name in HIGHER_IS_BETTER:
+            change = -change
+        if name.endswith("_ms") and abs(value - reference) < NOISE_FLOOR_MS:
+            continue
+        if change > tolerance:
+            regressions.append((name, reference, value, change))
+    return regressions
+
+
+def settings_of(args) -> dict:
+    return {k: getattr(args, k) for k in
+            ("runs", "concurrency", "llm_latency", "search_latency", "http_latency", "connect_latency", "query_latency",
+             "mirror")}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="seconds per simulated LLM call")
+    parser.add_argument("--search-latency", type=float, default=0.3, help="seconds per simulated Tavily search")
+    parser.add_argument("--http-latency", type=float, default=0.1, help="seconds per scraped page")
+    parser.add_argument("--connect-latency", type=float, default=0.5, help="seconds per Snowflake connect")
+    parser.add_argument("--query-latency", type=float, default=0.1, help="seconds per Snowflake query")
+    parser.add_argument("--mirror", action="store_true", help="sync the fake warehouse into the DuckDB mirror first")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed regression as a fraction")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="bench-")
+    configure_environment(workdir, args)
+    sys.path.insert(0, REPO_ROOT)
+    startup = bench_startup(args.runs)
+    fakes = install_fakes(workdir, args)
+    from langgraph_code.langgraph_flow import runnable
+
+    async def run_all() -> dict:
+        metrics = dict(startup)
+        metrics.update(await bench_graph(runnable, args.runs, cold=True))
+        metrics.update(await bench_graph(runnable, args.runs, cold=False))
+        metrics.update(await bench_memory(runnable))
+        metrics.update(await bench_api(args.concurrency))
+        metrics.update(await bench_api_memory(args.concurrency))
+        return metrics
+
+    try:
+        metrics = asyncio.run(run_all())
+    finally:
+        fakes["pages"].close()
+
+    print(json.dumps(metrics, indent=2))
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({"settings": settings_of(args), "metrics": metrics}, f, indent=2)
+            f.write("\n")
+        print(f"Saved baselines to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baselines recorded yet; run with --save-baseline")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("settings") != settings_of(args):
+        print("Warning: baselines were recorded with different settings; comparison may be meaningless")
+    regressions = compare(metrics, baseline["metrics"], args.tolerance)
+    for name, reference, value, change in regressions:
+        print(f"REGRESSION {name}: {reference} -> {value} ({change:+.0%})")
+    if not regressions:
+        print(f"No regressions beyond {args.tolerance:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
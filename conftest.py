@@ -0,0 +1 @@
+# Lets `pytest` import the top-level packages (agents, utils, ...) from the repository root.
@@ -1,6 +1,7 @@
 import streamlit as st
 import requests
 import base64
+import json
 from io import BytesIO
 
 st.set_page_config(page_title="Research Assistant", layout="centered")
@@ -31,13 +32,58 @@ query = st.text_input("Ask your research question below...")
 # Placeholder for displaying the response
 response_placeholder = st.empty()
 
+def iter_sse(response):
+    """Parse a text/event-stream response into (event, data) pairs."""
+    event, data_lines = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if line is None:
+            continue
+        if line == "":
+            if data_lines:
+                yield event, json.loads("\n".join(data_lines))
+            event, data_lines = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data_lines.append(line[len("data:"):].strip())
+
+
 if query:
-    with st.spinner("Thinking..."):
-        try:
-            res = requests.post(f"{backend_base_url}/use-all-agents/", params={"query": query})
-            result = res.json()["result"]
-            response_placeholder.markdown(result)
-        
-        except Exception as e:
-            error_text = f"Error: {e}"
-            response_placeholder.error(error_text)
\ No newline at end of file
+    progress = st.status("Researching...", expanded=False)
+    try:
+        with requests.get(f"{backend_base_url}/use-all-agents/stream", params={"query": query}, stream=True) as res:
+            res.raise_for_status()
+            # report sections are written concurrently; keep each one's text and render them in order
+            section_order, section_texts = [], {}
+            for event, data in iter_sse(res):
+                if event == "oracle_decision":
+                    tools = ", ".join(call["tool"] for call in data["tool_calls"]) or "none"
+                    progress.write(f"Oracle selected: {tools}")
+                elif event == "node_start" and data["node"] != "oracle":
+                    progress.update(label=f"Running {data['node']}...")
+                elif event == "node_end" and data["node"] != "oracle":
+                    # duration_ms is None when the node's start event was not seen
+                    if data.get("duration_ms") is None:
+                        progress.write(f"{data['node']} finished")
+                    else:
+                        progress.write(f"{data['node']} finished in {data['duration_ms'] / 1000:.1f}s")
+                elif event == "report_start":
+                    progress.update(label="Writing report...")
+                    section_order = data.get("sections", [])
+                    section_texts = {}
+                elif event == "token":
+                    section = data.get("section")
+                    section_texts[section] = section_texts.get(section, "") + data["text"]
+                    ordered = [key for key in section_order if key in section_texts]
+                    ordered += [key for key in section_texts if key not in section_order]
+                    response_placeholder.markdown("\n\n".join(section_texts[key] for key in ordered))
+                elif event == "done":
+                    response_placeholder.markdown(data["result"])
+                    progress.update(label="Done", state="complete")
+                elif event == "error":
+                    raise RuntimeError(data["detail"])
+
+    except Exception as e:
+        progress.update(label="Failed", state="error")
+        error_text = f"Error: {e}"
+        response_placeholder.error(error_text)
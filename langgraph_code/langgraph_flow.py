@@ -1,6 +1,6 @@
 import os
-from langchain_openai import ChatOpenAI
 from langgraph.graph import StateGraph, END
+from langgraph.types import Send
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.agents import AgentAction
 from typing import TypedDict, Annotated
@@ -8,6 +8,10 @@ from langchain_core.messages import BaseMessage
 import operator
 
 from langgraph_code.tools import *
+from utils.artifact_store import find_artifact_urls
+from langgraph_code.scratchpad import make_step_digest, build_scratchpad, source_images
+from utils.telemetry import traced_node
+from utils.clients import get_client, register_client
 
 
 # Define LangChain agent state
@@ -15,15 +19,21 @@ class AgentState(TypedDict):
     input: str
     chat_history: list[BaseMessage]
     intermediate_steps: Annotated[list[tuple[AgentAction, str]], operator.add]
+    # compact per-step digests the oracle reads instead of raw tool outputs
+    step_digests: Annotated[list[dict], operator.add]
+
+# When enabled, every tool call from one oracle turn runs concurrently in the
+# same graph step instead of one tool per oracle round trip.
+PARALLEL_TOOLS = os.getenv("ORACLE_PARALLEL_TOOLS", "true").lower() == "true"
+# When enabled, the final_report_tool node writes the report inside the graph and
+# callers use it directly instead of regenerating it from the logs afterwards.
+REPORT_SINGLE_PASS = os.getenv("REPORT_SINGLE_PASS", "true").lower() == "true"
+# Article images the oracle did not carry into final_report_tool are appended to the
+# market overview, up to this many.
+MAX_REPORT_SOURCE_IMAGES = int(os.getenv("MAX_REPORT_SOURCE_IMAGES", "6"))
 
 # --- LLM & prompt setup ---
 
-llm = ChatOpenAI(
-    model="gpt-4o",
-    openai_api_key=os.environ["OPENAI_API_KEY"],
-    temperature=0
-)
-
 system_prompt = """
 You are the oracle, the great AI decision maker.
 Given the user's query you must decide what to do with it based on the
@@ -59,6 +69,9 @@ TOOLS AVAILABLE:
 
 IMPORTANT:
 - Always reply with a structured tool call in JSON.
+- When several tools are needed and they do not depend on each other (e.g. snowflake_tool and web_search_tool),
+  call them together in the same turn; they will run in parallel.
+- Call final_report_tool on its own, never alongside other tools.
 - Do NOT write explanations or summaries unless using `final_report_tool`.
 """
 
@@ -77,30 +90,37 @@ tools = [
         final_report_tool
     ]
 
-def create_scratchpad(intermediate_steps: list[AgentAction]):
-    research_steps = []
-    for i, action in enumerate(intermediate_steps):
-        if action.log != "TBD":
-            research_steps.append(
-                f"Tool: {action.tool}, input: {action.tool_input}\n"
-                f"Output: {action.log}"
+def create_scratchpad(intermediate_steps: list[AgentAction], step_digests: list[dict] = None):
+    if step_digests is None:
+        # no precomputed digests (e.g. state built outside the graph): digest on the fly
+        step_digests = [
+            make_step_digest(action.tool, action.tool_input, action.log)
+            for action in intermediate_steps
+            if action.log != "TBD"
+        ]
+    return build_scratchpad(step_digests)
+
+def _build_oracle():
+    return (
+        {
+            "input": lambda x: x["input"],
+            "chat_history": lambda x: x["chat_history"],
+            "scratchpad": lambda x: create_scratchpad(
+                intermediate_steps=x["intermediate_steps"],
+                step_digests=x.get("step_digests")
             )
-    return "\n---\n".join(research_steps)
+        }
+        | prompt
+        | get_client("chat").bind_tools(tools, tool_choice="any")
+    )
 
-oracle = (
-    {
-        "input": lambda x: x["input"],
-        "chat_history": lambda x: x["chat_history"],
-        "scratchpad": lambda x: create_scratchpad( intermediate_steps=x["intermediate_steps"])
-    }
-    | prompt
-    | llm.bind_tools(tools, tool_choice="any")
-)
+# built on the first oracle call, from the shared chat model
+register_client("oracle", _build_oracle, depends_on=("chat",))
 
 def run_oracle(state: AgentState):
     print("run_oracle")
     print(f"intermediate_steps: {state['intermediate_steps']}")
-    out = oracle.invoke(state)
+    out = get_client("oracle").invoke(state)
     print("[DEBUG] TOOL CALLS:", out.tool_calls)
 
     if not out.tool_calls:
@@ -122,26 +142,46 @@ def run_oracle(state: AgentState):
             ]
         }
 
-    tool_name = out.tool_calls[0]["name"]
-    tool_args = out.tool_calls[0]["args"]
-    action_out = AgentAction(
-        tool=tool_name,
-        tool_input=tool_args,
-        log="TBD"
-    )
+    tool_calls = out.tool_calls if PARALLEL_TOOLS else out.tool_calls[:1]
+    # the report must see every other tool's output, so it only runs when picked alone
+    if len(tool_calls) > 1:
+        tool_calls = [call for call in tool_calls if call["name"] != "final_report_tool"]
+
     return {
-        "intermediate_steps": [action_out]
+        "intermediate_steps": [
+            AgentAction(
+                tool=call["name"],
+                tool_input=call["args"],
+                log="TBD"
+            )
+            for call in tool_calls
+        ]
     }
 
 def router(state: AgentState):
     # If final_report_tool has been called, route to END so that it is not re‑invoked.
-    if any(action.tool == "final_report_tool" for action in state["intermediate_steps"]):
+    # In single-pass mode a pending (TBD) report call still has to run its node first.
+    if any(
+        action.tool == "final_report_tool" and (action.log != "TBD" or not REPORT_SINGLE_PASS)
+        for action in state["intermediate_steps"]
+    ):
         return END
-    # Otherwise, return the tool from the last AgentAction if available.
-    if state["intermediate_steps"]:
-        return state["intermediate_steps"][-1].tool
-    else:
+    if not state["intermediate_steps"]:
         return "web_search_tool"
+
+    # Fan out every pending action from the latest oracle turn. Each tool node gets
+    # the completed history plus its own action last, which is what run_tool reads.
+    steps = state["intermediate_steps"]
+    turn_start = len(steps)
+    while turn_start > 0 and steps[turn_start - 1].log == "TBD":
+        turn_start -= 1
+    pending = steps[turn_start:]
+    if len(pending) <= 1:
+        return steps[-1].tool
+    return [
+        Send(action.tool, {**state, "intermediate_steps": steps[:turn_start] + [action]})
+        for action in pending
+    ]
     
 tool_str_to_func = {
     "snowflake_tool": snowflake_tool,
@@ -156,10 +196,21 @@ def run_tool(state: list):
 
     if tool_name == "final_report_tool" and isinstance(tool_args, dict):
         for step in state["intermediate_steps"]:
-            if step.tool == "snowflake_tool" and "data:image/png;base64" in step.log:
-                chart_html = f'<img src="{step.log}" alt="Chart">'
-                tool_args["quantitative_analysis"] += f"\n\n{chart_html}"
+            chart_urls = find_artifact_urls(step.log) if step.tool == "snowflake_tool" else []
+            if chart_urls:
+                tool_args["quantitative_analysis"] += f"\n\n![Chart]({chart_urls[0]})"
                 break
+        # the oracle only sees image URLs in the digests; add back article images it left out
+        written = " ".join(str(value) for value in tool_args.values())
+        missing = {}
+        for step in state["intermediate_steps"]:
+            if step.tool == "web_search_tool":
+                for markdown, url in source_images(step.log):
+                    if url not in written:
+                        missing.setdefault(url, markdown)
+        if missing:
+            images = "\n".join(list(missing.values())[:MAX_REPORT_SOURCE_IMAGES])
+            tool_args["market_overview"] = f"{tool_args.get('market_overview') or ''}\n\n{images}"
 
     print(f"{tool_name}.invoke(input={tool_args})")
 
@@ -169,16 +220,19 @@ def run_tool(state: list):
         tool_input=tool_args,
         log=str(out)
     )
-    return {"intermediate_steps": [action_out]}
+    return {
+        "intermediate_steps": [action_out],
+        "step_digests": [make_step_digest(tool_name, tool_args, action_out.log)]
+    }
 
 # Define the graph
 graph = StateGraph(AgentState)
 
-graph.add_node("oracle", run_oracle)
-graph.add_node("snowflake_tool", run_tool)
-graph.add_node("web_search_tool", run_tool)
-graph.add_node("image_generator_tool", run_tool)
-graph.add_node("final_report_tool", run_tool)
+graph.add_node("oracle", traced_node("oracle", run_oracle))
+graph.add_node("snowflake_tool", traced_node("snowflake_tool", run_tool))
+graph.add_node("web_search_tool", traced_node("web_search_tool", run_tool))
+graph.add_node("image_generator_tool", traced_node("image_generator_tool", run_tool))
+graph.add_node("final_report_tool", traced_node("final_report_tool", run_tool))
 
 graph.set_entry_point("oracle")
 
@@ -0,0 +1,148 @@
+import ast
+import os
+import re
+from functools import lru_cache
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# total tokens the oracle's scratchpad may use, and the cap for any single step digest
+SCRATCHPAD_TOKEN_BUDGET = int(os.getenv("SCRATCHPAD_TOKEN_BUDGET", "6000"))
+STEP_DIGEST_TOKENS = int(os.getenv("STEP_DIGEST_TOKENS", "800"))
+ARTICLE_SNIPPET_CHARS = 400
+CHARS_PER_TOKEN = 4  # rough estimate used when tiktoken is unavailable
+
+IMAGE_MARKDOWN = re.compile(r"!\[[^\]]*\]\([^)]*\)")
+IMAGE_HTML = re.compile(r"<img[^>]*>", re.I)
+IMAGE_URL = re.compile(r"!\[[^\]]*\]\(\s*([^)\s]+)[^)]*\)|<img[^>]*\bsrc=[\"']([^\"']+)", re.I)
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    """tiktoken encoding for gpt-4o, or None when it cannot be loaded (e.g. offline)."""
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model("gpt-4o")
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        print(f"tiktoken unavailable, estimating tokens from characters: {e}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    encoding = _encoding()
+    if encoding is None:
+        return len(text) // CHARS_PER_TOKEN + 1
+    return len(encoding.encode(text))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    encoding = _encoding()
+    if encoding is None:
+        if len(text) <= max_tokens * CHARS_PER_TOKEN:
+            return text
+        return text[:max_tokens * CHARS_PER_TOKEN] + " …[truncated]"
+    tokens = encoding.encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens]) + " …[truncated]"
+
+
+def strip_images(text: str) -> str:
+    return IMAGE_HTML.sub("", IMAGE_MARKDOWN.sub("", text or ""))
+
+
+def source_images(text: str) -> list:
+    """(markdown, url) of each image in a tool log, e.g. article images in web_search_tool output."""
+    return [(m.group(0), m.group(1)) for m in IMAGE_URL.finditer(text or "") if m.group(1)]
+
+
+def _digest_web_search(output: str) -> str:
+    """Keep titles, a short snippet, the source link (plus syndicated copies) and the image URLs of each article."""
+    lines = []
+    for block in re.split(r"\n\s*---\s*\n", output):
+        images = [a or b for a, b in IMAGE_URL.findall(block)]
+        block = strip_images(block).strip()
+        title = re.search(r"^\s*###\s*(.+)$", block, re.M)
+        source = re.search(r"\[Visit Source\]\(([^)]+)\)", block)
+        # YouTube list or section headers (possibly sharing a block with the first article); keep the links only
+        preamble = block[:title.start()] if title else block
+        lines.extend(re.findall(r"^- \[.+?\]\(.+?\)$", preamble, re.M))
+        if not title:
+            continue
+        body = block[title.end():]
+        body = body[:source.start() - title.end()] if source else body
+        snippet = " ".join(body.split())[:ARTICLE_SNIPPET_CHARS]
+        also = re.search(r"^\s*Also reported by:(.*)$", block, re.M)
+        links = [source.group(1) if source else "no link"]
+        if also:
+            links.append("also reported by " + ", ".join(dict.fromkeys(re.findall(r"\]\(([^)]+)\)", also.group(1)))))
+        lines.append(f"* {title.group(1).strip()}: {snippet} ({'; '.join(links)})")
+        if images:
+            lines.append(f"  images: {' '.join(images)}")
+    return "\n".join(lines)
+
+
+def _digest_structured(output: str) -> str:
+    """Tool outputs that are dict reprs (snowflake_tool): keep the informative keys."""
+    try:
+        data = ast.literal_eval(output)
+    except (ValueError, SyntaxError):
+        return output
+    if not isinstance(data, dict):
+        return output
+    keep = ("error", "summary", "sql", "data_preview", "row_count", "truncated", "chart_url")
+    return "\n".join(f"{key}: {data[key]}" for key in keep if data.get(key) not in (None, ""))
+
+
+def digest_output(tool: str, output: str) -> str:
+    """
+    Compact summary of one tool output, capped at STEP_DIGEST_TOKENS. Inline images are
+    dropped; web search digests keep article image URLs so the report can still show them.
+    """
+    if tool == "web_search_tool":
+        text = _digest_web_search(output or "")
+    else:
+        text = strip_images(output)
+        if text.lstrip().startswith("{"):
+            text = _digest_structured(text)
+    text = re.sub(r"\n{3,}", "\n\n", text).strip()
+    return truncate_tokens(text, STEP_DIGEST_TOKENS)
+
+
+def make_step_digest(tool: str, tool_input, output: str) -> dict:
+    """Computed once, when a tool step finishes; stored in the graph state."""
+    digest = digest_output(tool, output)
+    return {
+        "tool": tool,
+        "tool_input": tool_input,
+        "digest": digest,
+        "tokens": count_tokens(digest),
+    }
+
+
+def build_scratchpad(step_digests: list, budget: int = SCRATCHPAD_TOKEN_BUDGET) -> str:
+    """
+    Render step digests for the oracle within `budget` tokens. The newest steps
+    keep their digests; older ones shrink to a one-line reference so the oracle
+    still knows which tools and inputs have already been used.
+    """
+    headers = [f"[step {i + 1}] Tool: {d['tool']}, input: {d['tool_input']}" for i, d in enumerate(step_digests)]
+    used = sum(count_tokens(header) for header in headers)
+    include = set()
+    for i in range(len(step_digests) - 1, -1, -1):
+        cost = step_digests[i]["tokens"]
+        if used + cost > budget:
+            break
+        used += cost
+        include.add(i)
+
+    research_steps = []
+    for i, (header, d) in enumerate(zip(headers, step_digests)):
+        if i in include:
+            research_steps.append(f"{header}\nOutput: {d['digest']}")
+        else:
+            research_steps.append(f"{header}\nOutput: (omitted to fit the scratchpad budget)")
+    return "\n---\n".join(research_steps)
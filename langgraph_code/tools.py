@@ -3,9 +3,6 @@ from agents.snowflake_agent import snowflake_tool as raw_snowflake_tool
 from agents.web_agent import web_search_tool as raw_web_tool
 from agents.image_generator_agent import image_agent as raw_image_tool
 from agents.final_report_agent import final_report_tool
-from langchain_openai import ChatOpenAI
-
-llm = ChatOpenAI(model="gpt-4o", temperature=0)
 
 
 @tool("snowflake_tool")
@@ -0,0 +1,24 @@
+from utils.article_corpus import ArticleCorpus
+from utils.dedup import dedupe_results
+
+
+def test_duplicate_urls_survive_the_corpus(tmp_path):
+    corpus = ArticleCorpus(str(tmp_path / "corpus.sqlite3"))
+    corpus.add("Air fryers top holiday lists", "Air fryers were the most searched appliance.",
+               "https://example.com/1", duplicate_urls=["https://mirror.example.com/1"])
+    hits = corpus.search("air fryers")
+    assert hits[0]["duplicate_urls"] == ["https://mirror.example.com/1"]
+    assert dedupe_results(hits)[0]["duplicate_urls"] == ["https://mirror.example.com/1"]
+
+
+def test_dedupe_merges_duplicates_already_carried():
+    text = "Air fryers were the most searched kitchen appliance of the holiday season this year."
+    results = [
+        {"title": "Air fryers", "content": text, "url": "https://a.example.com", "score": 0.9,
+         "duplicate_urls": ["https://b.example.com"]},
+        {"title": "Air fryers", "content": text, "url": "https://c.example.com", "score": 0.5,
+         "duplicate_urls": ["https://d.example.com"]},
+    ]
+    [kept] = dedupe_results(results)
+    assert kept["url"] == "https://a.example.com"
+    assert kept["duplicate_urls"] == ["https://b.example.com", "https://c.example.com", "https://d.example.com"]
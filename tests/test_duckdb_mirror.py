@@ -0,0 +1,79 @@
+from datetime import date
+
+import pytest
+
+from utils.duckdb_mirror import date_bounds, rollup_sql
+from utils.sql_templates import sql_from_template
+
+WHERE = "SELECT * FROM ON_SITE_SEARCH WHERE COUNTRY = 840 AND "
+
+
+@pytest.mark.parametrize("condition, bounds", [
+    ("DATE BETWEEN '2023-01-01' AND '2023-03-31'", (date(2023, 1, 1), date(2023, 3, 31))),
+    ("DATE >= '2023-01-01' AND DATE < '2023-04-01'", (date(2023, 1, 1), date(2023, 3, 31))),
+    ("DATE < '2023-04-01' AND DATE > '2022-12-31'", (date(2023, 1, 1), date(2023, 3, 31))),
+    ("(SITE_RULE ILIKE '%amazon%' OR SITE_RULE ILIKE '%walmart%') AND DATE BETWEEN '2023-01-01' AND '2023-03-31'",
+     (date(2023, 1, 1), date(2023, 3, 31))),
+    ("OSS_KEYWORD = 'salt or pepper' AND DATE BETWEEN '2023-01-01' AND '2023-03-31'",
+     (date(2023, 1, 1), date(2023, 3, 31))),
+])
+def test_single_range(condition, bounds):
+    assert date_bounds(WHERE + condition) == bounds
+
+
+@pytest.mark.parametrize("condition", [
+    "(DATE BETWEEN '2023-01-01' AND '2023-01-31' OR DATE BETWEEN '2023-06-01' AND '2023-06-30')",
+    "DATE BETWEEN '2023-01-01' AND '2023-01-31' OR OSS_KEYWORD = 'tv'",
+    "(DATE >= '2023-01-01' OR DATE <= '2023-03-31')",
+    "DATE >= '2023-01-01' AND SITE_RULE = 'amazon.com' AND DATE <= '2023-03-31'",
+    "NOT DATE BETWEEN '2023-01-01' AND '2023-03-31'",
+    "DATE >= '2023-01-01'",
+])
+def test_anything_else_goes_to_snowflake(condition):
+    assert date_bounds(WHERE + condition) is None
+
+
+def test_case_expressions_are_not_filters():
+    sql = sql_from_template("fastest growing products on Amazon in 2023", "amazon")["sql"]
+    assert date_bounds(sql) == (date(2023, 1, 1), date(2023, 12, 31))
+
+
+@pytest.mark.parametrize("query", [
+    "What are the top 5 searched products on Amazon in 2023?",
+    "Compare Amazon vs Walmart in Q2 2023",
+    "How has air fryer grown on Amazon in 2023",
+])
+def test_whole_month_sums_use_the_rollup(query):
+    rewritten = rollup_sql(sql_from_template(query, "amazon")["sql"])
+    assert "FROM ON_SITE_SEARCH_MONTHLY" in rewritten
+    assert "DATE" not in rewritten.replace("MONTH BETWEEN", "")
+
+
+def test_rollup_rewrite_of_a_monthly_trend():
+    sql = ("SELECT DATE_TRUNC('month', DATE) AS MONTH_START, SUM(CALIBRATED_VISITS) AS VISITS FROM DB.PUBLIC.ON_SITE_SEARCH"
+           " WHERE COUNTRY = 840 AND OSS_KEYWORD = 'on_site_search' AND DATE >= '2023-01-01' AND DATE < '2023-04-01'"
+           " GROUP BY MONTH_START")
+    assert rollup_sql(sql) == (
+        "SELECT MONTH AS MONTH_START, SUM(CALIBRATED_VISITS) AS VISITS FROM ON_SITE_SEARCH_MONTHLY"
+        " WHERE COUNTRY = 840 AND OSS_KEYWORD = 'on_site_search' AND MONTH BETWEEN '2023-01-01' AND '2023-03-31'"
+        " GROUP BY MONTH_START"
+    )
+
+
+@pytest.mark.parametrize("sql", [
+    WHERE + "DATE BETWEEN '2023-01-05' AND '2023-03-31' GROUP BY OSS_KEYWORD",
+    WHERE + "DATE BETWEEN '2023-01-01' AND '2023-03-30' GROUP BY OSS_KEYWORD",
+    "SELECT OSS_KEYWORD, COUNT(*) FROM ON_SITE_SEARCH WHERE DATE BETWEEN '2023-01-01' AND '2023-03-31' GROUP BY 1",
+    "SELECT OSS_KEYWORD, MAX(CALIBRATED_VISITS) FROM ON_SITE_SEARCH WHERE DATE BETWEEN '2023-01-01' AND '2023-03-31'"
+    " GROUP BY 1",
+    "SELECT DATE, SUM(CALIBRATED_VISITS) FROM ON_SITE_SEARCH WHERE DATE BETWEEN '2023-01-01' AND '2023-03-31'"
+    " GROUP BY DATE",
+    "SELECT OSS_KEYWORD, CALIBRATED_VISITS FROM ON_SITE_SEARCH WHERE DATE BETWEEN '2023-01-01' AND '2023-03-31'",
+])
+def test_other_queries_use_the_daily_partitions(sql):
+    assert rollup_sql(sql) is None
+
+
+def test_growth_and_weekly_templates_use_the_daily_partitions():
+    assert rollup_sql(sql_from_template("fastest growing products on Amazon in 2023", "amazon")["sql"]) is None
+    assert rollup_sql(sql_from_template("weekly trend for 'air fryer' on Amazon in 2023", "amazon")["sql"]) is None
@@ -0,0 +1,27 @@
+import pytest
+
+from agents.image_generator_agent import compress_prompt_locally
+
+
+@pytest.mark.parametrize("prompt", [
+    "What are the most searched products on Amazon in 2023?",
+    "Which platforms sell the most air fryers?",
+    "How do air fryers work?",
+    "Why are standing desks trending?",
+    "air fryer growth on Walmart vs Amazon",
+    "fryer",
+])
+def test_questions_without_a_visual_subject_go_to_the_llm(prompt):
+    assert compress_prompt_locally(prompt) is None
+
+
+@pytest.mark.parametrize("prompt, subject, keywords", [
+    ("Draw a futuristic smart kitchen with an air fryer", "futuristic smart kitchen with an air fryer",
+     "futuristic, smart, kitchen, air, fryer"),
+    ("What does a smart kitchen look like?", "smart kitchen", "smart, kitchen"),
+    ("Can you please show me a robot vacuum cleaning a living room", "robot vacuum cleaning a living room",
+     "robot, vacuum, cleaning, living, room"),
+])
+def test_visual_subjects_are_compressed_locally(prompt, subject, keywords):
+    spec = compress_prompt_locally(prompt)
+    assert spec.startswith(f"Flat infographic illustration of {subject}. Key elements: {keywords}.")
@@ -0,0 +1,22 @@
+from utils.result_cache import canonicalize_sql, sql_hash
+
+
+def test_formatting_differences_share_a_key():
+    a = "SELECT a ,b FROM t WHERE x = 1 -- note\n;"
+    b = "select a, b\nfrom t where x=1"
+    assert canonicalize_sql(a) == canonicalize_sql(b)
+    assert sql_hash(a) == sql_hash(b)
+
+
+def test_spacing_around_literal_is_ignored():
+    assert sql_hash("WHERE k IN ( 'a' , 'b' )") == sql_hash("where k in('a','b')")
+
+
+def test_literals_are_kept_verbatim():
+    pairs = [
+        ("SELECT * FROM t WHERE k ILIKE '%ipad , pro%'", "SELECT * FROM t WHERE k ILIKE '%ipad,pro%'"),
+        ("SELECT * FROM t WHERE k = 'x = 1'", "SELECT * FROM t WHERE k = 'x=1'"),
+        ("SELECT * FROM t WHERE k = 'Air Fryer'", "SELECT * FROM t WHERE k = 'air fryer'"),
+    ]
+    for a, b in pairs:
+        assert sql_hash(a) != sql_hash(b)
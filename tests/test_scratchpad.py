@@ -0,0 +1,48 @@
+from langgraph_code.scratchpad import digest_output, source_images
+
+WEB_OUTPUT = """## YouTube Links
+- [Air fryer review](https://www.youtube.com/watch?v=1)
+- [Best air fryers 2023](https://www.youtube.com/watch?v=2)
+
+## Article Summaries with Images
+### Air fryers top holiday lists
+
+    Air fryers were the most searched appliance this season.
+
+    ![hero image](https://example.com/hero.jpg)
+
+    🔗 [Visit Source](https://example.com/article/1)
+    Also reported by: [https://mirror.example.com/1](https://mirror.example.com/1)
+
+---
+
+### Standing desks keep growing
+
+    Remote work keeps standing desk demand high.
+
+    🔗 [Visit Source](https://example.com/article/2)
+"""
+
+
+def test_web_search_digest_keeps_youtube_links_and_articles():
+    digest = digest_output("web_search_tool", WEB_OUTPUT)
+    assert "- [Air fryer review](https://www.youtube.com/watch?v=1)" in digest
+    assert "- [Best air fryers 2023](https://www.youtube.com/watch?v=2)" in digest
+    assert "* Air fryers top holiday lists: Air fryers were the most searched appliance this season." in digest
+    assert "(https://example.com/article/1" in digest
+    assert "* Standing desks keep growing:" in digest
+
+
+def test_web_search_digest_keeps_image_urls():
+    digest = digest_output("web_search_tool", WEB_OUTPUT)
+    assert "images: https://example.com/hero.jpg" in digest
+    assert "![hero image]" not in digest
+
+
+def test_source_images():
+    assert source_images(WEB_OUTPUT) == [("![hero image](https://example.com/hero.jpg)", "https://example.com/hero.jpg")]
+
+
+def test_web_search_digest_keeps_duplicate_sources():
+    digest = digest_output("web_search_tool", WEB_OUTPUT)
+    assert "(https://example.com/article/1; also reported by https://mirror.example.com/1)" in digest
@@ -0,0 +1,32 @@
+import pytest
+
+from agents.snowflake_agent import apply_row_limit
+
+
+def test_limit_is_appended_after_order_by():
+    sql = "SELECT OSS_KEYWORD, SUM(CALIBRATED_VISITS) AS V FROM ON_SITE_SEARCH GROUP BY 1 ORDER BY V DESC;"
+    assert apply_row_limit(sql, 100) == sql.rstrip(";") + "\nLIMIT 101"
+
+
+def test_trailing_comment_cannot_swallow_the_limit():
+    assert apply_row_limit("SELECT 1 -- one row", 9) == "SELECT 1 -- one row\nLIMIT 10"
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT * FROM ON_SITE_SEARCH ORDER BY DATE LIMIT 10",
+    "WITH T AS (SELECT * FROM ON_SITE_SEARCH) SELECT * FROM T ORDER BY DATE LIMIT 10",
+    "SELECT TOP 10 * FROM ON_SITE_SEARCH",
+    "SELECT * FROM ON_SITE_SEARCH FETCH FIRST 10 ROWS ONLY",
+    "SHOW TABLES",
+])
+def test_statements_with_their_own_limit_are_unchanged(sql):
+    assert apply_row_limit(sql, 100) == sql
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT * FROM (SELECT * FROM ON_SITE_SEARCH LIMIT 5) ORDER BY DATE",
+    "SELECT * FROM ON_SITE_SEARCH WHERE OSS_KEYWORD = 'limit 5'",
+    "SELECT * FROM ON_SITE_SEARCH /* LIMIT 5 */",
+])
+def test_inner_limits_literals_and_comments_do_not_count(sql):
+    assert apply_row_limit(sql, 100) == sql + "\nLIMIT 101"
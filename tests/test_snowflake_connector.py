@@ -0,0 +1,30 @@
+from utils.snowflake_connector import SnowflakeConnectionPool
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+
+    def is_closed(self):
+        return self.closed
+
+    def close(self):
+        self.closed = True
+
+
+def test_connections_open_lazily():
+    opened = []
+    pool = SnowflakeConnectionPool(min_size=2, max_size=4, connect=lambda: opened.append(FakeConnection()) or opened[-1])
+    assert opened == []
+    pool.release(pool.acquire())
+    assert len(opened) == 1
+
+
+def test_idle_eviction_stops_at_min_size():
+    pool = SnowflakeConnectionPool(min_size=1, max_size=4, idle_timeout=0, connect=FakeConnection)
+    conns = [pool.acquire() for _ in range(3)]
+    for conn in conns:
+        pool.release(conn)
+    pool.release(pool.acquire())
+    assert pool._size == 1
+    assert sum(conn.closed for conn in conns) == 2
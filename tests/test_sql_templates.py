@@ -0,0 +1,60 @@
+from datetime import date
+
+import pytest
+
+from utils.sql_templates import classify_intent, sql_from_template
+
+
+@pytest.mark.parametrize("query", [
+    "Top searches on Amazon since 2021",
+    "Top searches on Amazon before 2023",
+    "Top searches on Amazon after 2021",
+    "Top searches on Amazon until 2023",
+    "What are the most searched products on Amazon in 2023, not electronics?",
+    "What are the most searched products on Amazon in 2023 excluding electronics?",
+    "Top products among women on Amazon in 2023",
+    "Compare top searches on Amazon in 2022 vs 2023",
+    "Compare Amazon vs Walmart holiday deals in 2023",
+    "Why do people like Amazon?",
+])
+def test_falls_back_to_llm(query):
+    assert classify_intent(query, "amazon") is None
+    assert sql_from_template(query, "amazon") is None
+
+
+def test_top_keywords():
+    intent, slots = classify_intent("What are the top 5 searched products on Amazon in 2023?", "amazon.com")
+    assert intent == "top_keywords"
+    assert (slots["start"], slots["end"]) == (date(2023, 1, 1), date(2023, 12, 31))
+    assert slots["platforms"] == ["amazon"]
+    assert slots["n"] == 5
+
+
+@pytest.mark.parametrize("query, keyword", [
+    ("Compare air fryer searches on Amazon vs Walmart in 2023", "air fryer"),
+    ("Compare robot vacuum popularity on Amazon and Walmart in 2023", "robot vacuum"),
+    ("Compare searches for tv on Amazon vs Walmart in Q2 2023", "tv"),
+    ("Compare Amazon vs Walmart in Q2 2023", None),
+])
+def test_platform_comparison_keyword(query, keyword):
+    intent, slots = classify_intent(query, "amazon")
+    assert intent == "platform_comparison"
+    assert slots["keyword"] == keyword
+    assert slots["platforms"] == ["amazon", "walmart"]
+
+
+def test_comparison_sql_filters_on_keyword():
+    result = sql_from_template("Compare air fryer searches on Amazon vs Walmart in 2023", "amazon")
+    assert "OSS_KEYWORD ILIKE '%air fryer%'" in result["sql"]
+
+
+def test_keyword_trend_ignores_apostrophes():
+    intent, slots = classify_intent("What's the weekly trend for 'air fryer' on Amazon in 2023?", "amazon")
+    assert intent == "keyword_trend"
+    assert slots["keyword"] == "air fryer"
+    assert slots["granularity"] == "week"
+
+
+def test_keyword_wildcards_are_escaped():
+    result = sql_from_template("Compare searches for 50% off on Amazon vs Walmart in 2023", "amazon")
+    assert "'%50!% off%' ESCAPE '!'" in result["sql"]
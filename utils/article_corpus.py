@@ -0,0 +1,121 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from dotenv import load_dotenv
+from utils.cache import register_cache
+
+load_dotenv()
+
+CORPUS_PATH = os.getenv("ARTICLE_CORPUS_PATH", os.path.join(".cache", "article_corpus.sqlite3"))
+# a local answer is used only when enough fresh articles cover enough of the query terms
+CORPUS_MIN_HITS = int(os.getenv("ARTICLE_CORPUS_MIN_HITS", "3"))
+CORPUS_MIN_COVERAGE = float(os.getenv("ARTICLE_CORPUS_MIN_COVERAGE", "0.8"))
+CORPUS_MAX_AGE_DAYS = float(os.getenv("ARTICLE_CORPUS_MAX_AGE_DAYS", "7"))
+CORPUS_MAX_RESULTS = int(os.getenv("ARTICLE_CORPUS_MAX_RESULTS", "10"))
+
+STOPWORDS = {
+    "the", "and", "for", "with", "what", "which", "are", "was", "were", "how", "why", "who",
+    "top", "most", "best", "about", "from", "into", "over", "this", "that", "these", "those",
+    "in", "on", "of", "to", "a", "an", "is", "by", "at", "or", "vs", "me", "show", "tell",
+}
+
+
+def query_terms(query: str) -> list:
+    """Lowercased content words of a query, in order, without duplicates."""
+    words = re.findall(r"[a-z0-9]+", query.lower())
+    return list(dict.fromkeys(w for w in words if len(w) > 1 and w not in STOPWORDS))
+
+
+class ArticleCorpus:
+    """
+    Local full-text index (SQLite FTS5, BM25 ranking) of every article and video
+    the web agent has paid to fetch, so recurring topics can be answered locally.
+    """
+
+    def __init__(self, path=CORPUS_PATH):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(articles)")]
+            if columns and "duplicate_urls" not in columns:
+                # FTS5 tables cannot be altered; the corpus is a cache, so start it again
+                print("Article corpus predates duplicate_urls, rebuilding it")
+                self._conn.execute("DROP TABLE articles")
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS articles USING fts5("
+                " title, content, url UNINDEXED, images UNINDEXED, kind UNINDEXED, fetched_at UNINDEXED,"
+                " duplicate_urls UNINDEXED, tokenize = 'porter unicode61')"
+            )
+            self._conn.commit()
+        register_cache("article_corpus", self)
+
+    def add(self, title: str, content: str, url: str, images: list = None, kind: str = "article",
+            duplicate_urls: list = None) -> None:
+        """Insert or refresh one document, keyed by URL, with the URLs of its collapsed near-duplicates."""
+        with self._lock:
+            self._conn.execute("DELETE FROM articles WHERE url = ?", (url,))
+            self._conn.execute(
+                "INSERT INTO articles (title, content, url, images, kind, fetched_at, duplicate_urls)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (title, content, url, json.dumps(images or []), kind, time.time(), json.dumps(duplicate_urls or []))
+            )
+            self._conn.commit()
+
+    def search(self, query: str, limit: int = CORPUS_MAX_RESULTS, max_age_days: float = CORPUS_MAX_AGE_DAYS) -> list:
+        """Fresh documents matching any query term, best BM25 score first."""
+        terms = query_terms(query)
+        if not terms:
+            return []
+        match = " OR ".join(f'"{term}"' for term in terms)
+        oldest = time.time() - max_age_days * 86400
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT title, content, url, images, kind, fetched_at, duplicate_urls FROM articles"
+                " WHERE articles MATCH ? AND fetched_at >= ? ORDER BY bm25(articles) LIMIT ?",
+                (match, oldest, limit)
+            ).fetchall()
+        return [
+            {"title": r[0], "content": r[1], "url": r[2], "images": [tuple(i) for i in json.loads(r[3])], "kind": r[4],
+             "duplicate_urls": json.loads(r[6] or "[]")}
+            for r in rows
+        ]
+
+    def lookup(self, query: str):
+        """
+        Local hits for `query` when they pass the coverage and freshness
+        thresholds, otherwise None (the caller should go to the web).
+        """
+        hits = self.search(query)
+        articles = [h for h in hits if h["kind"] == "article"]
+        terms = query_terms(query)
+        covered = [t for t in terms if any(t in f"{h['title']} {h['content']}".lower() for h in articles)]
+        coverage = len(covered) / len(terms) if terms else 0.0
+        if len(articles) >= CORPUS_MIN_HITS and coverage >= CORPUS_MIN_COVERAGE:
+            with self._lock:
+                self.hits += 1
+            return hits
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "size": size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+article_corpus = ArticleCorpus()
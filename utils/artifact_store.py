@@ -0,0 +1,101 @@
+import hashlib
+import os
+import re
+import threading
+from dotenv import load_dotenv
+from utils.cache import TTLCache
+
+load_dotenv()
+
+ARTIFACT_DIR = os.getenv("ARTIFACT_DIR", os.path.join(".cache", "artifacts"))
+# public prefix the FastAPI app serves artifacts under; used in report markdown
+ARTIFACT_BASE_URL = os.getenv("ARTIFACT_BASE_URL", "http://localhost:8000/artifacts").rstrip("/")
+ARTIFACT_MEMORY_ITEMS = int(os.getenv("ARTIFACT_MEMORY_ITEMS", "64"))
+
+ARTIFACT_NAME = re.compile(r"^[0-9a-f]{64}\.[a-z0-9]{1,5}$")
+ALIAS_KEY = re.compile(r"^[0-9a-f]{64}$")
+ARTIFACT_URL = re.compile(re.escape(ARTIFACT_BASE_URL) + r"/[0-9a-f]{64}\.[a-z0-9]{1,5}")
+
+
+class ArtifactStore:
+    """
+    Content-addressed store for binary tool outputs (charts, images).
+
+    Files live under `directory` named `<sha256>.<ext>`, so identical bytes are
+    stored once. Recently used artifacts are also kept in an in-memory LRU.
+    Graph state only ever carries the short URL returned by `url()`.
+    """
+
+    def __init__(self, directory=ARTIFACT_DIR, memory_items=ARTIFACT_MEMORY_ITEMS):
+        self.directory = directory
+        self._memory = TTLCache("artifacts", max_size=memory_items, ttl_seconds=24 * 3600)
+        os.makedirs(os.path.join(directory, "aliases"), exist_ok=True)
+
+    def put(self, data: bytes, ext: str = "png") -> str:
+        """Store `data` and return its artifact name."""
+        name = f"{hashlib.sha256(data).hexdigest()}.{ext.lower().lstrip('.')}"
+        path = self.path(name)
+        if not os.path.exists(path):
+            _atomic_write(path, data)
+        self._memory.set(name, data)
+        return name
+
+    def set_alias(self, key: str, name: str) -> None:
+        """
+        Point a caller-defined key (a SHA-256 hex digest of whatever produced the
+        artifact, e.g. a prompt) at a stored artifact.
+        """
+        _atomic_write(self._alias_path(key), name.encode("utf-8"))
+
+    def get_alias(self, key: str):
+        """Artifact name stored under `key`, or None when unknown or the file is gone."""
+        try:
+            with open(self._alias_path(key), "r", encoding="utf-8") as f:
+                name = f.read().strip()
+        except FileNotFoundError:
+            return None
+        return name if ARTIFACT_NAME.match(name) and os.path.exists(self.path(name)) else None
+
+    def _alias_path(self, key: str) -> str:
+        if not ALIAS_KEY.match(key):
+            raise ValueError(f"Invalid alias key: {key}")
+        return os.path.join(self.directory, "aliases", key)
+
+    def get(self, name: str):
+        """Bytes for an artifact name, or None when it does not exist."""
+        if not ARTIFACT_NAME.match(name):
+            return None
+        data = self._memory.get(name)
+        if data is not None:
+            return data
+        try:
+            with open(self.path(name), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        self._memory.set(name, data)
+        return data
+
+    def path(self, name: str) -> str:
+        if not ARTIFACT_NAME.match(name):
+            raise ValueError(f"Invalid artifact name: {name}")
+        return os.path.join(self.directory, name)
+
+    def url(self, name: str) -> str:
+        return f"{ARTIFACT_BASE_URL}/{name}"
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    # write to a private temp file first so concurrent readers never see partial files
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def find_artifact_urls(text: str) -> list:
+    """Artifact URLs referenced in a block of text (e.g. a tool log)."""
+    return ARTIFACT_URL.findall(text or "")
+
+
+artifact_store = ArtifactStore()
@@ -0,0 +1,90 @@
+import threading
+import time
+from collections import OrderedDict
+
+# every named cache registers itself here so its counters can be reported
+_registry = {}
+
+
+class TTLCache:
+    """
+    Thread-safe in-memory LRU cache whose entries expire after `ttl_seconds`.
+    Keeps hit/miss/eviction counters for reporting through `cache_stats()`.
+    """
+
+    def __init__(self, name: str, max_size: int = 256, ttl_seconds: float = 3600):
+        self.name = name
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        register_cache(name, self)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def items(self) -> list:
+        """Snapshot of the live (key, value) pairs, most recently used last."""
+        now = time.monotonic()
+        with self._lock:
+            return [(key, value) for key, (expires_at, value) in self._data.items() if expires_at >= now]
+
+    def record_hit(self) -> None:
+        """
+        Turn the last counted miss into a hit, for callers that served a lookup
+        themselves after `get` missed (e.g. a similarity search over `items()`).
+        """
+        with self._lock:
+            self.hits += 1
+            self.misses -= 1
+
+    def invalidate(self, key=None) -> None:
+        """Drop one key, or everything when no key is given."""
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+def register_cache(name: str, cache) -> None:
+    """Make any object with a `stats()` method show up in `cache_stats()`."""
+    _registry[name] = cache
+
+
+def cache_stats() -> dict:
+    """Counters for every registered cache, keyed by cache name."""
+    return {name: cache.stats() for name, cache in _registry.items()}
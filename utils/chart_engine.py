@@ -0,0 +1,197 @@
+import base64
+import io
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import pandas as pd
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CHART_WORKERS = int(os.getenv("CHART_WORKERS", "2"))
+CHART_TIMEOUT_SECONDS = float(os.getenv("CHART_TIMEOUT_SECONDS", "20"))
+TOP_K = int(os.getenv("CHART_TOP_K", "10"))
+MAX_SERIES = 5
+
+TREND_WORDS = re.compile(r"\b(trend|trends|trending|over time|monthly|weekly|daily|timeline|growth|seasonal\w*)\b", re.I)
+COMPARE_WORDS = re.compile(r"\b(compare|comparison|versus|vs\.?|across platforms|between)\b", re.I)
+DATE_NAME = re.compile(r"(DATE|MONTH|YEAR|WEEK|DAY|PERIOD)", re.I)
+SITE_NAME = re.compile(r"(SITE|PLATFORM|DOMAIN)", re.I)
+
+
+def _column_roles(df: pd.DataFrame) -> dict:
+    """Split columns into date, numeric and categorical roles from names and dtypes."""
+    roles = {"date": None, "numeric": [], "site": None, "category": None}
+    for col in df.columns:
+        series = df[col]
+        if roles["date"] is None and (pd.api.types.is_datetime64_any_dtype(series) or DATE_NAME.search(str(col))):
+            roles["date"] = col
+        elif pd.api.types.is_numeric_dtype(series) or pd.to_numeric(series, errors="coerce").notna().all():
+            roles["numeric"].append(col)
+        elif roles["site"] is None and SITE_NAME.search(str(col)):
+            roles["site"] = col
+        elif roles["category"] is None:
+            roles["category"] = col
+    return roles
+
+
+def choose_template(df: pd.DataFrame, query: str):
+    """
+    Pick a chart template from the DataFrame schema and the wording of the query.
+    Returns (template_name, spec) or None when no template fits.
+    """
+    if df.empty:
+        return None
+    roles = _column_roles(df)
+    if not roles["numeric"]:
+        return None
+    spec = {
+        "value": roles["numeric"][0],
+        "date": roles["date"],
+        "site": roles["site"],
+        "category": roles["category"],
+        "title": query.strip()[:80],
+    }
+    wants_trend = bool(TREND_WORDS.search(query))
+    wants_compare = bool(COMPARE_WORDS.search(query))
+
+    if roles["site"] and (wants_compare or df[roles["site"]].nunique() > 1) and not (wants_trend and roles["date"]):
+        return "platform_comparison", spec
+    if roles["date"] and (wants_trend or not (roles["category"] or roles["site"])):
+        return "time_series", spec
+    if roles["category"] or roles["site"]:
+        if spec["category"] is None:
+            spec["category"] = roles["site"]
+        return "top_k_bar", spec
+    if roles["date"]:
+        return "time_series", spec
+    return None
+
+
+def _time_series(ax, df, spec):
+    data = df.copy()
+    data[spec["date"]] = pd.to_datetime(data[spec["date"]], errors="coerce")
+    data[spec["value"]] = pd.to_numeric(data[spec["value"]], errors="coerce")
+    group = spec["category"] or spec["site"]
+    if group:
+        top = data.groupby(group)[spec["value"]].sum().nlargest(MAX_SERIES).index
+        data = data[data[group].isin(top)]
+        pivot = data.pivot_table(index=spec["date"], columns=group, values=spec["value"], aggfunc="sum").sort_index()
+        for name in pivot.columns:
+            ax.plot(pivot.index, pivot[name], marker="o", label=str(name))
+        ax.legend(fontsize=8)
+    else:
+        series = data.groupby(spec["date"])[spec["value"]].sum().sort_index()
+        ax.plot(series.index, series.values, marker="o")
+    ax.set_xlabel(spec["date"])
+    ax.set_ylabel(spec["value"])
+
+
+def _top_k_bar(ax, df, spec):
+    values = pd.to_numeric(df[spec["value"]], errors="coerce")
+    series = values.groupby(df[spec["category"]]).sum().nlargest(TOP_K).sort_values()
+    ax.barh([str(i) for i in series.index], series.values)
+    ax.set_xlabel(spec["value"])
+    ax.set_ylabel(spec["category"])
+
+
+def _platform_comparison(ax, df, spec):
+    data = df.copy()
+    data[spec["value"]] = pd.to_numeric(data[spec["value"]], errors="coerce")
+    if spec["category"]:
+        top = data.groupby(spec["category"])[spec["value"]].sum().nlargest(TOP_K).index
+        data = data[data[spec["category"]].isin(top)]
+        pivot = data.pivot_table(index=spec["category"], columns=spec["site"], values=spec["value"], aggfunc="sum").fillna(0)
+        pivot = pivot.loc[pivot.sum(axis=1).sort_values(ascending=False).index]
+        width = 0.8 / max(len(pivot.columns), 1)
+        positions = range(len(pivot.index))
+        for i, site in enumerate(pivot.columns):
+            ax.bar([p + i * width for p in positions], pivot[site].values, width=width, label=str(site))
+        ax.set_xticks([p + width * (len(pivot.columns) - 1) / 2 for p in positions])
+        ax.set_xticklabels([str(i) for i in pivot.index], rotation=45, ha="right")
+        ax.legend(fontsize=8)
+        ax.set_xlabel(spec["category"])
+    else:
+        series = data.groupby(spec["site"])[spec["value"]].sum().sort_values(ascending=False)
+        ax.bar([str(i) for i in series.index], series.values)
+        ax.set_xlabel(spec["site"])
+    ax.set_ylabel(spec["value"])
+
+
+TEMPLATES = {
+    "time_series": _time_series,
+    "top_k_bar": _top_k_bar,
+    "platform_comparison": _platform_comparison,
+}
+
+
+def _render(template: str, df: pd.DataFrame, spec: dict) -> str:
+    """Runs inside a worker process: draw the template with the Agg backend and return base64 PNG."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+    try:
+        TEMPLATES[template](ax, df, spec)
+        ax.set_title(spec["title"])
+        ax.grid(alpha=0.3)
+        fig.tight_layout()
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png", dpi=100)
+        return base64.b64encode(buffer.getvalue()).decode()
+    finally:
+        plt.close(fig)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Forking a process that already runs the event loop, DB pools and client threads can copy held locks
+            # into the child; forkserver (spawn where it is unavailable) starts workers from a clean interpreter.
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context("forkserver")
+                # Import pandas/matplotlib once in the server so each worker forks from a warm interpreter
+                context.set_forkserver_preload(["utils.chart_engine", "matplotlib.pyplot"])
+            else:
+                context = multiprocessing.get_context("spawn")
+            _executor = ProcessPoolExecutor(max_workers=CHART_WORKERS, mp_context=context)
+        return _executor
+
+
+def _reset_executor():
+    """Drop a pool whose worker died so the next render starts a fresh one."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def render_chart(df: pd.DataFrame, query: str):
+    """
+    Render a chart for the query result with a local template.
+    Returns base64-encoded PNG, or None when no template fits or rendering fails.
+    """
+    choice = choose_template(df, query)
+    if choice is None:
+        return None
+    template, spec = choice
+    print(f"[CHART] rendering template '{template}' with {spec}")
+    try:
+        return _get_executor().submit(_render, template, df, spec).result(timeout=CHART_TIMEOUT_SECONDS)
+    except BrokenProcessPool as e:
+        print(f"Local chart rendering failed: {e}; restarting the chart workers")
+        _reset_executor()
+        return None
+    except Exception as e:
+        print(f"Local chart rendering failed: {e}")
+        return None
@@ -0,0 +1,94 @@
+import os
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "50"))
+HTTP_TIMEOUT_SECONDS = float(os.getenv("HTTP_TIMEOUT_SECONDS", "120"))
+CHAT_MODEL = os.getenv("CHAT_MODEL", "gpt-4o")
+
+_factories = {}
+_dependents = {}  # name -> clients built on top of it
+_clients = {}
+_lock = threading.RLock()
+
+
+def register_client(name: str, factory, depends_on: tuple = ()) -> None:
+    """Register how to build a client; nothing is constructed until `get_client(name)`."""
+    _factories[name] = factory
+    for dependency in depends_on:
+        _dependents.setdefault(dependency, set()).add(name)
+
+
+def _drop(name: str) -> None:
+    _clients.pop(name, None)
+    for dependent in _dependents.get(name, ()):
+        _drop(dependent)
+
+
+def get_client(name: str):
+    """The shared client `name`, built on first use (SDK imports happen here, not at module import)."""
+    client = _clients.get(name)
+    if client is not None:
+        return client
+    with _lock:
+        if name not in _clients:
+            _clients[name] = _factories[name]()
+        return _clients[name]
+
+
+def set_client(name: str, client) -> None:
+    """Replace a client (e.g. with a local stand-in); clients built on top of it are rebuilt on next use."""
+    with _lock:
+        _drop(name)
+        _clients[name] = client
+
+
+def reset_clients() -> None:
+    with _lock:
+        _clients.clear()
+
+
+def _http():
+    import httpx
+    # one connection pool for every SDK that accepts an httpx client
+    return httpx.Client(
+        timeout=HTTP_TIMEOUT_SECONDS,
+        follow_redirects=True,
+        limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_CONNECTIONS)
+    )
+
+
+def _openai():
+    from openai import OpenAI
+    return OpenAI(api_key=os.getenv("OPENAI_API_KEY"), http_client=get_client("http"))
+
+
+def _chat():
+    from langchain_openai import ChatOpenAI
+    from utils.telemetry import llm_telemetry
+    return ChatOpenAI(
+        model=CHAT_MODEL,
+        openai_api_key=os.environ["OPENAI_API_KEY"],
+        temperature=0,
+        http_client=get_client("http"),
+        callbacks=[llm_telemetry]
+    )
+
+
+def _mistral():
+    from mistralai import Mistral
+    return Mistral(api_key=os.getenv("MISTRAL_API_KEY"), client=get_client("http"))
+
+
+def _tavily():
+    from tavily import TavilyClient
+    return TavilyClient(api_key=os.getenv("TAVILY_API_KEY"))
+
+
+register_client("http", _http)
+register_client("openai", _openai, depends_on=("http",))
+register_client("chat", _chat, depends_on=("http",))
+register_client("mistral", _mistral, depends_on=("http",))
+register_client("tavily", _tavily)
@@ -0,0 +1,67 @@
+import hashlib
+import os
+import re
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# fingerprints within this many differing bits (of 64) count as the same article
+DEDUP_HAMMING_THRESHOLD = int(os.getenv("DEDUP_HAMMING_THRESHOLD", "10"))
+SHINGLE_SIZE = 3
+BITS = 64
+
+
+def _shingles(text: str) -> list:
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return [" ".join(words)] if words else []
+    return [" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)]
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash over word 3-gram shingles."""
+    weights = [0] * BITS
+    for shingle in _shingles(text):
+        h = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(BITS):
+            weights[bit] += 1 if h >> bit & 1 else -1
+    return sum(1 << bit for bit in range(BITS) if weights[bit] > 0)
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def _rank(result: dict) -> tuple:
+    # prefer the search engine's relevance score, then the fuller text
+    return (result.get("score") or 0.0, len(result.get("content") or ""))
+
+
+def dedupe_results(results: list, threshold: int = DEDUP_HAMMING_THRESHOLD) -> list:
+    """
+    Collapse near-duplicate search results (e.g. syndicated copies of one story).
+
+    Each group keeps its best-ranked result, in the position of the group's
+    first member; the other members' URLs (and any duplicates they already
+    carried, e.g. corpus hits) are listed under "duplicate_urls" so no source is lost.
+    """
+    groups = []  # [fingerprint, members]
+    for result in results:
+        fingerprint = simhash(f"{result.get('title', '')} {result.get('content', '')}")
+        for group in groups:
+            if hamming_distance(fingerprint, group[0]) <= threshold:
+                group[1].append(result)
+                break
+        else:
+            groups.append([fingerprint, [result]])
+
+    deduped = []
+    for _, members in groups:
+        best = max(members, key=_rank)
+        urls = [url for m in members for url in [m["url"], *(m.get("duplicate_urls") or [])]]
+        duplicate_urls = [url for url in dict.fromkeys(urls) if url != best["url"]]
+        deduped.append({**best, "duplicate_urls": duplicate_urls})
+    removed = len(results) - len(deduped)
+    if removed:
+        print(f"Collapsed {removed} near-duplicate results")
+    return deduped
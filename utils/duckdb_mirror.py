@@ -0,0 +1,386 @@
+import argparse
+import glob
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from datetime import date, timedelta
+from dotenv import load_dotenv
+from utils.cache import register_cache
+from utils.snowflake_connector import snowflake_connection
+
+load_dotenv()
+
+MIRROR_DIR = os.getenv("DUCKDB_MIRROR_DIR", os.path.join(".cache", "mirror"))
+MIRROR_ENABLED = os.getenv("DUCKDB_MIRROR_ENABLED", "true").lower() == "true"
+# how far back the first sync reaches, and how many trailing days each sync re-pulls for late data
+MIRROR_LOOKBACK_DAYS = int(os.getenv("DUCKDB_MIRROR_LOOKBACK_DAYS", "730"))
+MIRROR_OVERLAP_DAYS = int(os.getenv("DUCKDB_MIRROR_OVERLAP_DAYS", "3"))
+
+SOURCE_TABLE = "ON_SITE_SEARCH"
+ROLLUP_VIEW = "ON_SITE_SEARCH_MONTHLY"
+COUNTRY = 840
+COLUMNS = ["DATE", "OSS_KEYWORD", "SITE_RULE", "CALIBRATED_VISITS", "CALIBRATED_USERS", "COUNTRY"]
+
+_ISO_DATE = r"'(\d{4}-\d{2}-\d{2})'"
+_BETWEEN = re.compile(rf"\bDATE\s+BETWEEN\s+{_ISO_DATE}\s+AND\s+{_ISO_DATE}", re.I)
+_LOWER = re.compile(rf"\bDATE\s*(>=|>)\s*{_ISO_DATE}", re.I)
+_UPPER = re.compile(rf"\bDATE\s*(<=|<)\s*{_ISO_DATE}", re.I)
+_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_CASE_EXPRESSION = re.compile(r"\bCASE\b.*?\bEND\b", re.I | re.DOTALL)
+_OR = re.compile(r"\bOR\b", re.I)
+_NEGATED = re.compile(r"\bNOT\s*\(*\s*$", re.I)
+_COUNTRY_FILTER = re.compile(rf"\bCOUNTRY\s*=\s*'?{COUNTRY}'?", re.I)
+_QUALIFIED_TABLE = re.compile(rf"\b(?:\w+\.)+({SOURCE_TABLE})\b", re.I)
+_SOURCE_TABLE = re.compile(rf"\b{SOURCE_TABLE}\b", re.I)
+_MONTH_TRUNC = re.compile(r"\bDATE_TRUNC\s*\(\s*'?month'?\s*,\s*DATE\s*\)", re.I)
+_ADDITIVE = re.compile(r"\bSUM\s*\(\s*CALIBRATED_(?:VISITS|USERS)\s*\)", re.I)
+_NON_ADDITIVE = re.compile(
+    r"\b(?:COUNT|AVG|MIN|MAX|MEDIAN|MODE|STDDEV\w*|VAR\w*|APPROX_\w+|PERCENTILE\w*|LISTAGG|ARRAY_AGG|ANY_VALUE)\s*\(",
+    re.I,
+)
+_ROW_LEVEL = re.compile(r"\bDATE\b|\bCALIBRATED_\w+|\bJOIN\b", re.I)
+
+
+def _or_encloses(text: str, start: int, end: int) -> bool:
+    """Whether an OR sits at the level of text[start:end] or in any group enclosing it."""
+    depth, depths = 0, []
+    for char in text:
+        depths.append(depth)
+        depth += (char == "(") - (char == ")")
+    for match in _OR.finditer(text):
+        q = match.start()
+        lo, hi = (q, start) if q < start else (end, q)
+        if min(depths[lo:hi + 1]) >= depths[q]:
+            return True
+    return False
+
+
+def _mask_literals(sql: str) -> str:
+    """Blank every literal but ISO dates, keeping offsets, so ORs and keywords inside strings don't count."""
+    return _LITERAL.sub(
+        lambda m: m.group(0) if re.fullmatch(_ISO_DATE, m.group(0)) else "'" + " " * (len(m.group(0)) - 2) + "'", sql
+    )
+
+
+def _date_filter(sql: str):
+    """(first, last, (start, end) of the predicate in `sql`) under the rules of `date_bounds`, else None."""
+    text = _CASE_EXPRESSION.sub(lambda m: " " * len(m.group(0)), _mask_literals(sql))
+    betweens = list(_BETWEEN.finditer(text))
+    lowers, uppers = list(_LOWER.finditer(text)), list(_UPPER.finditer(text))
+    if len(betweens) == 1 and not lowers and not uppers:
+        match = betweens[0]
+        span = match.span()
+        first, last = date.fromisoformat(match.group(1)), date.fromisoformat(match.group(2))
+    elif not betweens and len(lowers) == 1 and len(uppers) == 1:
+        lower, upper = lowers[0], uppers[0]
+        left, right = sorted((lower, upper), key=lambda m: m.start())
+        if not re.fullmatch(r"\s+AND\s+", text[left.end():right.start()], re.I):
+            return None
+        span = (left.start(), right.end())
+        first = date.fromisoformat(lower.group(2)) + timedelta(days=1 if lower.group(1) == ">" else 0)
+        last = date.fromisoformat(upper.group(2)) - timedelta(days=1 if upper.group(1) == "<" else 0)
+    else:
+        return None
+    if _NEGATED.search(text[:span[0]]) or _or_encloses(text, *span):
+        return None
+    return first, last, span
+
+
+def date_bounds(sql: str):
+    """
+    (first, last) day a query filters DATE to, or None unless the filter is one
+    `DATE BETWEEN` or one AND-ed lower/upper pair that no OR or NOT can widen.
+    Comparisons inside CASE expressions are not filters and are ignored.
+    """
+    found = _date_filter(sql)
+    return found[:2] if found else None
+
+
+def rollup_sql(sql: str):
+    """
+    `sql` rewritten onto the keyword x site x month rollup, or None unless it is a
+    GROUP BY over ON_SITE_SEARCH whose DATE range is whole months, whose only
+    measures are SUM(CALIBRATED_VISITS) / SUM(CALIBRATED_USERS) and which uses DATE
+    nowhere else than in DATE_TRUNC('month', DATE).
+    """
+    sql = _QUALIFIED_TABLE.sub(r"\1", sql)
+    found = _date_filter(sql)
+    if found is None:
+        return None
+    first, last, (start, end) = found
+    if first.day != 1 or (last + timedelta(days=1)).day != 1:
+        return None
+    masked = _mask_literals(sql)
+    if (len(_SOURCE_TABLE.findall(masked)) != 1 or not re.search(r"\bGROUP\s+BY\b", masked, re.I)
+            or _NON_ADDITIVE.search(masked)):
+        return None
+    rewritten = f"{sql[:start]}MONTH BETWEEN '{first.isoformat()}' AND '{last.isoformat()}'{sql[end:]}"
+    rewritten = _MONTH_TRUNC.sub("MONTH", rewritten)
+    # rename the table outside string literals only; the odd parts of the split are the literals
+    parts = re.split(r"('(?:[^']|'')*')", rewritten)
+    rewritten = "".join(part if i % 2 else _SOURCE_TABLE.sub(ROLLUP_VIEW, part) for i, part in enumerate(parts))
+    if _ROW_LEVEL.search(_ADDITIVE.sub(" ", _mask_literals(rewritten))):
+        return None
+    return rewritten
+
+
+def _month_windows(start: date, end: date):
+    """Split [start, end] into calendar-month pieces so a sync never holds more than a month in memory."""
+    while start <= end:
+        next_month = (start.replace(day=1) + timedelta(days=32)).replace(day=1)
+        yield start, min(end, next_month - timedelta(days=1))
+        start = next_month
+
+
+def _fetch_arrow(cursor):
+    import pyarrow as pa
+    from snowflake.connector.errors import NotSupportedError
+    try:
+        batches = list(cursor.fetch_arrow_batches())
+        return pa.concat_tables(batches) if batches else None
+    except NotSupportedError:
+        columns = [col[0] for col in cursor.description]
+        rows = cursor.fetchall()
+        return pa.Table.from_pylist([dict(zip(columns, row)) for row in rows]) if rows else None
+
+
+class DuckDBMirror:
+    """
+    ON_SITE_SEARCH rows for COUNTRY = 840 as Parquet partitioned by DATE and
+    SITE_RULE, plus a keyword x site x month rollup, queried with DuckDB.
+
+    `try_query(sql)` answers a generated Snowflake query locally when its DATE
+    range is covered by the synced window and DuckDB can bind it; otherwise it
+    returns None and the caller goes to Snowflake. Sums over whole months (the
+    templated top-keyword, comparison and monthly trend queries) read the
+    rollup instead of the daily partitions.
+
+    Sync it incrementally with `python -m utils.duckdb_mirror` (e.g. from cron).
+    """
+
+    def __init__(self, directory=MIRROR_DIR, enabled=MIRROR_ENABLED):
+        self.directory = directory
+        self.enabled = enabled
+        self.data_dir = os.path.join(directory, "data")
+        self.state_path = os.path.join(directory, "state.json")
+        self.rollup_path = os.path.join(directory, "rollup", "keyword_site_month.parquet")
+        self.hits = 0
+        self.rollup_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        register_cache("duckdb_mirror", self)
+
+    # --- state ---
+
+    def state(self) -> dict:
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _write_state(self, state: dict) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = f"{self.state_path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, self.state_path)
+
+    def coverage(self):
+        """(first, last) synced day, or None before the first sync."""
+        state = self.state()
+        if not state.get("synced_from"):
+            return None
+        return date.fromisoformat(state["synced_from"]), date.fromisoformat(state["synced_through"])
+
+    def covers(self, start: date, end: date) -> bool:
+        coverage = self.coverage()
+        return coverage is not None and coverage[0] <= start and end <= coverage[1]
+
+    # --- querying ---
+
+    def _connect(self):
+        import duckdb
+        conn = duckdb.connect()
+        conn.execute(
+            f"CREATE VIEW {SOURCE_TABLE} AS SELECT {', '.join(COLUMNS)} FROM read_parquet("
+            f"'{self.data_dir}/*/*/*.parquet', hive_partitioning = true,"
+            " hive_types = {'DATE': DATE, 'SITE_RULE': VARCHAR})"
+        )
+        if os.path.exists(self.rollup_path):
+            conn.execute(f"CREATE VIEW {ROLLUP_VIEW} AS SELECT * FROM read_parquet('{self.rollup_path}')")
+        return conn
+
+    def query(self, sql: str):
+        """Run `sql` against the local views; result columns are uppercased like Snowflake's."""
+        conn = self._connect()
+        try:
+            df = conn.execute(_QUALIFIED_TABLE.sub(r"\1", sql)).df()
+        finally:
+            conn.close()
+        df.columns = [str(col).upper() for col in df.columns]
+        return df
+
+    def try_query(self, sql: str):
+        """The query result from the mirror, or None when the mirror cannot answer it."""
+        if not self.enabled:
+            return None
+        bounds = date_bounds(sql)
+        reason = None
+        if not _COUNTRY_FILTER.search(sql):
+            reason = "no COUNTRY = 840 filter"
+        elif bounds is None:
+            reason = "no bounded DATE range"
+        elif not self.covers(*bounds):
+            reason = f"DATE range {bounds[0]}..{bounds[1]} outside mirror coverage {self.coverage()}"
+        if reason is None and os.path.exists(self.rollup_path) and (rollup := rollup_sql(sql)) is not None:
+            try:
+                df = self.query(rollup)
+                with self._lock:
+                    self.hits += 1
+                    self.rollup_hits += 1
+                print(f"[MIRROR] answered from the monthly rollup ({len(df)} rows)")
+                return df
+            except Exception as e:
+                print(f"[MIRROR] rollup could not run it, using the daily partitions: {e}")
+        if reason is None:
+            try:
+                df = self.query(sql)
+                with self._lock:
+                    self.hits += 1
+                print(f"[MIRROR] answered locally ({len(df)} rows)")
+                return df
+            except Exception as e:
+                # dialect differences or columns the mirror lacks: let Snowflake answer
+                reason = f"DuckDB could not run it: {e}"
+        with self._lock:
+            self.misses += 1
+        print(f"[MIRROR] falling back to Snowflake: {reason}")
+        return None
+
+    # --- sync ---
+
+    def sync(self, start: date = None, end: date = None) -> dict:
+        """
+        Pull [start, end] from Snowflake (default: from the last synced day minus
+        MIRROR_OVERLAP_DAYS, or MIRROR_LOOKBACK_DAYS back on the first run, through
+        yesterday), replace those date partitions and rebuild the rollup.
+        """
+        import duckdb
+        end = end or date.today() - timedelta(days=1)
+        coverage = self.coverage()
+        if start is None:
+            start = (coverage[1] - timedelta(days=MIRROR_OVERLAP_DAYS) if coverage
+                     else end - timedelta(days=MIRROR_LOOKBACK_DAYS))
+        if coverage:
+            # keep the mirrored window contiguous so coverage checks stay truthful
+            start = min(start, coverage[1] + timedelta(days=1))
+            end = max(end, coverage[0] - timedelta(days=1))
+        os.makedirs(self.directory, exist_ok=True)
+        rows = 0
+        for window_start, window_end in _month_windows(start, end):
+            sql = (
+                f"SELECT {', '.join(COLUMNS)} FROM {SOURCE_TABLE} WHERE COUNTRY = {COUNTRY}"
+                f" AND DATE BETWEEN '{window_start.isoformat()}' AND '{window_end.isoformat()}'"
+            )
+            with snowflake_connection() as conn:
+                cursor = conn.cursor()
+                try:
+                    cursor.execute(sql)
+                    table = _fetch_arrow(cursor)
+                finally:
+                    cursor.close()
+            staging = os.path.join(self.directory, f"staging-{uuid.uuid4().hex}")
+            if table is not None and table.num_rows:
+                local = duckdb.connect()
+                try:
+                    local.register("batch", table)
+                    local.execute(
+                        "COPY (SELECT CAST(DATE AS DATE) AS DATE, OSS_KEYWORD, SITE_RULE,"
+                        " CAST(CALIBRATED_VISITS AS DOUBLE) AS CALIBRATED_VISITS,"
+                        " CAST(CALIBRATED_USERS AS DOUBLE) AS CALIBRATED_USERS,"
+                        " CAST(COUNTRY AS INTEGER) AS COUNTRY FROM batch)"
+                        f" TO '{staging}' (FORMAT PARQUET, PARTITION_BY (DATE, SITE_RULE))"
+                    )
+                finally:
+                    local.close()
+                rows += table.num_rows
+            self._swap_in(staging, window_start, window_end)
+            print(f"[MIRROR] synced {window_start}..{window_end}")
+
+        synced_from = min(start, coverage[0]) if coverage else start
+        synced_through = max(end, coverage[1]) if coverage else end
+        # rebuild before widening the recorded coverage so the rollup never lags it
+        self.rebuild_rollup()
+        self._write_state({
+            "synced_from": synced_from.isoformat(),
+            "synced_through": synced_through.isoformat(),
+            "synced_at": time.time(),
+        })
+        return {"rows": rows, "start": start.isoformat(), "end": end.isoformat()}
+
+    def _swap_in(self, staging: str, start: date, end: date) -> None:
+        """Replace every DATE partition in [start, end] with the staged one (or drop it if none was staged)."""
+        os.makedirs(self.data_dir, exist_ok=True)
+        day = start
+        while day <= end:
+            name = f"DATE={day.isoformat()}"
+            target = os.path.join(self.data_dir, name)
+            staged = os.path.join(staging, name)
+            trash = f"{target}.old-{uuid.uuid4().hex}"
+            if os.path.exists(target):
+                os.replace(target, trash)
+            if os.path.exists(staged):
+                os.replace(staged, target)
+            shutil.rmtree(trash, ignore_errors=True)
+            day += timedelta(days=1)
+        shutil.rmtree(staging, ignore_errors=True)
+
+    def rebuild_rollup(self) -> None:
+        """Keyword x site x month totals over the whole mirror; DAYS counts the days each row aggregates."""
+        if not glob.glob(os.path.join(self.data_dir, "*", "*", "*.parquet")):
+            return  # nothing synced yet
+        os.makedirs(os.path.dirname(self.rollup_path), exist_ok=True)
+        tmp = f"{self.rollup_path}.{uuid.uuid4().hex}.tmp"
+        conn = self._connect()
+        try:
+            conn.execute(
+                "COPY (SELECT CAST(DATE_TRUNC('month', DATE) AS DATE) AS MONTH, OSS_KEYWORD, SITE_RULE, COUNTRY,"
+                " SUM(CALIBRATED_VISITS) AS CALIBRATED_VISITS, SUM(CALIBRATED_USERS) AS CALIBRATED_USERS,"
+                f" COUNT(DISTINCT DATE) AS DAYS FROM {SOURCE_TABLE} GROUP BY ALL)"
+                f" TO '{tmp}' (FORMAT PARQUET)"
+            )
+        finally:
+            conn.close()
+        os.replace(tmp, self.rollup_path)
+
+    def stats(self) -> dict:
+        coverage = self.coverage()
+        partitions = sum(len(files) for _, _, files in os.walk(self.data_dir)) if os.path.isdir(self.data_dir) else 0
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": partitions,
+                "synced_from": coverage[0].isoformat() if coverage else None,
+                "synced_through": coverage[1].isoformat() if coverage else None,
+                "hits": self.hits,
+                "rollup_hits": self.rollup_hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+duckdb_mirror = DuckDBMirror()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sync the local ON_SITE_SEARCH mirror from Snowflake.")
+    parser.add_argument("--start", type=date.fromisoformat, help="first day to (re)sync, YYYY-MM-DD")
+    parser.add_argument("--end", type=date.fromisoformat, help="last day to sync, YYYY-MM-DD (default: yesterday)")
+    args = parser.parse_args()
+    print(duckdb_mirror.sync(args.start, args.end))
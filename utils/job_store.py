@@ -0,0 +1,150 @@
+import asyncio
+import os
+import time
+import uuid
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MAX_CONCURRENT_JOBS = int(os.getenv("MAX_CONCURRENT_JOBS", "4"))
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", "3600"))
+
+
+class JobStore:
+    """
+    In-process registry of background research jobs.
+
+    Jobs run as asyncio tasks; a semaphore bounds how many graph runs execute
+    at once so a burst of requests cannot exhaust the worker's thread pool.
+    Finished jobs are kept for JOB_TTL_SECONDS so clients can fetch results.
+
+    Jobs created with a `key` are single-flight: while one is queued or running,
+    `find_in_flight(key)` returns it so identical requests can share its result.
+    Work can `publish` progress events while it runs; `follow(job)` replays and
+    tails them so an attached stream sees the same progress as the first one.
+    """
+
+    def __init__(self, max_concurrency: int = MAX_CONCURRENT_JOBS, ttl_seconds: int = JOB_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._jobs = {}
+        self._tasks = {}
+        self._in_flight = {}  # key -> job_id
+        self._done_events = {}  # job_id -> asyncio.Event
+        self._events = {}  # job_id -> published (event, payload) pairs, dropped when the job finishes
+        self._signals = {}  # job_id -> asyncio.Event set on the next publish or when the job finishes
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    def create(self, query: str, key: str = None) -> dict:
+        self._evict_expired()
+        job_id = uuid.uuid4().hex
+        job = {
+            "job_id": job_id,
+            "query": query,
+            "key": key,
+            "cached": False,
+            "status": "queued",
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None,
+        }
+        self._jobs[job_id] = job
+        self._done_events[job_id] = asyncio.Event()
+        self._events[job_id] = []
+        return job
+
+    def find_in_flight(self, key: str):
+        """The queued or running job for `key`, if any."""
+        job_id = self._in_flight.get(key)
+        return self._jobs.get(job_id) if job_id else None
+
+    def complete(self, job: dict, result, cached: bool = True) -> None:
+        """Finish a job immediately with an already known result (e.g. a cache hit)."""
+        job["result"] = result
+        job["cached"] = cached
+        job["status"] = "completed"
+        job["started_at"] = job["finished_at"] = time.time()
+        self._done_events.pop(job["job_id"]).set()
+        self._events.pop(job["job_id"], None)
+        self._wake(job["job_id"])
+
+    async def wait(self, job: dict) -> dict:
+        """Wait until `job` has completed or failed."""
+        event = self._done_events.get(job["job_id"])
+        if event is not None:
+            await event.wait()
+        return job
+
+    def publish(self, job: dict, event: str, payload) -> None:
+        """Record a progress event of a running job for everyone following it."""
+        events = self._events.get(job["job_id"])
+        if events is not None:
+            events.append((event, payload))
+            self._wake(job["job_id"])
+
+    async def follow(self, job: dict):
+        """Yield the events published for `job` so far, then new ones as they arrive, until it finishes."""
+        events = self._events.get(job["job_id"], [])
+        index = 0
+        while True:
+            while index < len(events):
+                yield events[index]
+                index += 1
+            if job["finished_at"] is not None:
+                return
+            signal = self._signals.setdefault(job["job_id"], asyncio.Event())
+            await signal.wait()
+
+    def _wake(self, job_id: str) -> None:
+        signal = self._signals.pop(job_id, None)
+        if signal is not None:
+            signal.set()
+
+    def get(self, job_id: str):
+        self._evict_expired()
+        return self._jobs.get(job_id)
+
+    def submit(self, job: dict, work) -> None:
+        """
+        Schedule `work` (a coroutine function taking the job dict and returning
+        the result) to run in the background for `job`.
+        """
+        if job["key"] is not None:
+            self._in_flight[job["key"]] = job["job_id"]
+        task = asyncio.create_task(self._run(job, work))
+        self._tasks[job["job_id"]] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job["job_id"], None))
+
+    async def _run(self, job: dict, work) -> None:
+        async with self._semaphore:
+            job["status"] = "running"
+            job["started_at"] = time.time()
+            try:
+                job["result"] = await work(job)
+                job["status"] = "completed"
+            except Exception as e:
+                print(f"Job {job['job_id']} failed: {e}")
+                job["error"] = str(e)
+                job["status"] = "failed"
+            finally:
+                job["finished_at"] = time.time()
+                if job["key"] is not None and self._in_flight.get(job["key"]) == job["job_id"]:
+                    del self._in_flight[job["key"]]
+                self._done_events.pop(job["job_id"]).set()
+                self._events.pop(job["job_id"], None)
+                self._wake(job["job_id"])
+
+    def _evict_expired(self) -> None:
+        now = time.time()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job["finished_at"] is not None and now - job["finished_at"] > self.ttl_seconds
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+def public_view(job: dict) -> dict:
+    """Job metadata without the (potentially large) result payload."""
+    return {k: v for k, v in job.items() if k != "result"}
@@ -1,16 +1,28 @@
-import os
 import json
 import re
-from langchain_openai import ChatOpenAI
 from agents.final_report_agent import FinalReportInput, final_report_tool
-from langgraph_code.langgraph_flow import graph
+from utils.artifact_store import find_artifact_urls
+from utils.clients import get_client
 
 from dotenv import load_dotenv
  
 load_dotenv()
 
 
-def generate_structured_summary_from_logs(state):
+EMPTY_REPORT_FIELDS = {
+    "executive_summary": "",
+    "market_overview": "",
+    "internal_insights": "",
+    "quantitative_analysis": "",
+    "recommendations": "",
+    "sources": ""
+}
+
+
+def extract_report_fields(state) -> dict:
+    """
+    Ask gpt-4o to condense the graph's tool logs into the six FinalReportInput fields.
+    """
     # Extract logs from all AgentAction objects
     logs = [action.log for action in state["intermediate_steps"]]
     print("\n\n\n\n\n\n\n\n\n\n Data")
@@ -40,13 +52,7 @@ Logs:
 {combined_logs}
     """
    
-    llm = ChatOpenAI(
-        model="gpt-4o",
-        openai_api_key=os.environ["OPENAI_API_KEY"],
-        temperature=0
-    )
-   
-    response = llm.invoke(prompt).content
+    response = get_client("chat").invoke(prompt).content
     try:
         response = response.strip("` \n")
         response_clean = response.replace("json", "", 1).strip()
@@ -54,15 +60,44 @@ Logs:
         structured_summary = json.loads(response_clean)
     except Exception as e:
         # In case parsing fails, return an object with empty values.
-        structured_summary = {
-            "executive_summary": "",
-            "market_overview": "",
-            "internal_insights": "",
-            "quantitative_analysis": "",
-            "recommendations": "",
-            "sources": ""
-        }
-        
+        structured_summary = dict(EMPTY_REPORT_FIELDS)
+
+    # charts are referenced by artifact URL; make sure they reach the report
+    quantitative = structured_summary.get("quantitative_analysis", "")
+    for chart_url in dict.fromkeys(find_artifact_urls(combined_logs)):
+        if chart_url not in quantitative:
+            quantitative += f"\n\n![Chart]({chart_url})"
+    structured_summary["quantitative_analysis"] = quantitative
+    return structured_summary
+
+
+def generate_structured_summary_from_logs(state):
+    structured_summary = extract_report_fields(state)
     final_report_md = final_report_tool.invoke(structured_summary)
 
-    return final_report_md
\ No newline at end of file
+    return final_report_md
+
+
+def report_from_graph(state):
+    """
+    The report written by the graph's final_report_tool node, or None when the
+    graph ended without one (autofail, or single-pass mode disabled).
+    """
+    for action in reversed(state["intermediate_steps"]):
+        if action.tool == "final_report_tool":
+            if action.log in ("TBD", "") or action.log.startswith("[AUTOFAIL]"):
+                return None
+            return action.log
+    return None
+
+
+def final_report_from_state(state):
+    """
+    Single-pass: reuse the report produced inside the graph, and only fall back to
+    extracting fields from the logs and regenerating it when there is none.
+    """
+    report = report_from_graph(state)
+    if report is not None:
+        return report
+    print("Graph ended without a report, generating it from the logs")
+    return generate_structured_summary_from_logs(state)
@@ -0,0 +1,152 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from dotenv import load_dotenv
+from utils.cache import register_cache
+
+load_dotenv()
+
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR", os.path.join(".cache", "results"))
+RESULT_CACHE_TTL_SECONDS = int(os.getenv("RESULT_CACHE_TTL_SECONDS", "86400"))
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+_STRING_LITERAL = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")")
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+
+
+def canonicalize_sql(sql: str) -> str:
+    """
+    Normalize SQL text so formatting-only differences map to the same cache key:
+    comments are dropped, whitespace is collapsed, a trailing semicolon is removed
+    and everything outside quoted literals/identifiers is lowercased.
+    """
+    parts = _STRING_LITERAL.split(sql.strip().rstrip(";"))
+    canonical = []
+    for i, part in enumerate(parts):
+        if i % 2:
+            canonical.append(part)  # quoted literal, keep verbatim
+        else:
+            part = _COMMENTS.sub(" ", part)
+            part = " ".join(part.lower().split())
+            # tidy spacing around punctuation so "a ,b" and "a, b" agree
+            canonical.append(re.sub(r"\s*([(),=<>])\s*", r"\1", part))
+    text = " ".join(p for p in canonical if p)
+    return text.strip().rstrip(";").strip()
+
+
+def sql_hash(sql: str) -> str:
+    return hashlib.sha256(canonicalize_sql(sql).encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    On-disk cache of query result sets stored as Parquet files named by SQL hash.
+
+    Entries expire `ttl_seconds` after they were written. When the directory grows
+    past `max_bytes`, the least recently read files are deleted first.
+    """
+
+    def __init__(self, directory=RESULT_CACHE_DIR, ttl_seconds=RESULT_CACHE_TTL_SECONDS,
+                 max_bytes=RESULT_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        register_cache("snowflake_results", self)
+
+    def _path(self, sql: str) -> str:
+        return os.path.join(self.directory, f"{sql_hash(sql)}.parquet")
+
+    def get(self, sql: str):
+        """Return the cached DataFrame for `sql`, or None when missing or expired."""
+        path = self._path(sql)
+        try:
+            written = os.path.getmtime(path)
+            if time.time() - written > self.ttl_seconds:
+                os.remove(path)
+                raise FileNotFoundError(path)
+            import pandas as pd
+            df = pd.read_parquet(path)
+            # record the read in atime so eviction drops cold entries first
+            os.utime(path, (time.time(), written))
+        except (FileNotFoundError, OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return df
+
+    def put(self, sql: str, df: "pd.DataFrame") -> None:
+        path = self._path(sql)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            df.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Failed to cache result set: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self._enforce_size()
+
+    def _entries(self) -> list:
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".parquet"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            entries.append((name, st))
+        return entries
+
+    def _enforce_size(self) -> None:
+        with self._lock:
+            entries = self._entries()
+            total = sum(st.st_size for _, st in entries)
+            now = time.time()
+            # expired entries go first, then least recently read
+            entries.sort(key=lambda e: (now - e[1].st_mtime <= self.ttl_seconds, e[1].st_atime))
+            for name, st in entries:
+                if total <= self.max_bytes and now - st.st_mtime <= self.ttl_seconds:
+                    break
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                    total -= st.st_size
+                    self.evictions += 1
+                except FileNotFoundError:
+                    pass
+
+    def clear(self) -> None:
+        with self._lock:
+            for name, _ in self._entries():
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._entries()
+            lookups = self.hits + self.misses
+            return {
+                "size": len(entries),
+                "bytes": sum(st.st_size for _, st in entries),
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+result_cache = ResultCache()
@@ -0,0 +1,205 @@
+import asyncio
+import codecs
+import os
+import threading
+from contextlib import asynccontextmanager
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlparse
+import httpx
+from dotenv import load_dotenv
+from utils.telemetry import trace_call
+
+load_dotenv()
+
+SCRAPE_TIMEOUT_SECONDS = float(os.getenv("SCRAPE_TIMEOUT_SECONDS", "5"))
+SCRAPE_DEADLINE_SECONDS = float(os.getenv("SCRAPE_DEADLINE_SECONDS", "8"))
+SCRAPE_MAX_CONNECTIONS = int(os.getenv("SCRAPE_MAX_CONNECTIONS", "20"))
+SCRAPE_PER_HOST = int(os.getenv("SCRAPE_PER_HOST", "2"))
+# streaming mode parses pages incrementally and stops reading early
+SCRAPE_STREAMING = os.getenv("SCRAPE_STREAMING", "true").lower() == "true"
+SCRAPE_MAX_BYTES = int(os.getenv("SCRAPE_MAX_BYTES", str(512 * 1024)))
+SCRAPE_CHUNK_SIZE = 16 * 1024
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+SKIP_ALT_KEYWORDS = ["logo", "icon", "header"]
+
+
+def parse_images(html: str, page_url: str, max_images: int = 3) -> list:
+    """First `max_images` content images on a page as (absolute_src, alt) tuples."""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, "html.parser")
+    images = []
+    for img in soup.find_all("img"):
+        image = _qualify_image(img.get("src", ""), img.get("alt", ""), page_url)
+        if image:
+            images.append(image)
+            if len(images) >= max_images:
+                break
+    return images
+
+
+def _qualify_image(src: str, alt: str, page_url: str):
+    """Normalize an <img> src, or return None for inline data, logos and icons."""
+    alt = (alt or "").lower()
+    if not src or src.startswith("data:"):
+        return None
+    if any(kw in alt for kw in SKIP_ALT_KEYWORDS):
+        return None
+    if src.startswith("//"):
+        src = "https:" + src
+    elif src.startswith("/"):
+        src = urljoin(page_url, src)
+    return src, alt
+
+
+def _known_encoding(encoding):
+    try:
+        return codecs.lookup(encoding).name if encoding else None
+    except LookupError:
+        return None
+
+
+class ImageCollector(HTMLParser):
+    """
+    Incremental <img> extractor fed with raw response bytes.
+
+    `feed_bytes` returns True once `max_images` qualifying images were found or
+    `max_bytes` were read, so callers can stop downloading the page.
+    """
+
+    def __init__(self, page_url: str, max_images: int = 3, max_bytes: int = SCRAPE_MAX_BYTES, encoding: str = None):
+        super().__init__(convert_charrefs=True)
+        self.page_url = page_url
+        self.max_images = max_images
+        self.max_bytes = max_bytes
+        self.images = []
+        self.bytes_read = 0
+        self._decoder = codecs.getincrementaldecoder(_known_encoding(encoding) or "utf-8")(errors="replace")
+
+    @property
+    def done(self) -> bool:
+        return len(self.images) >= self.max_images or self.bytes_read >= self.max_bytes
+
+    def handle_starttag(self, tag, attrs):
+        if tag != "img" or len(self.images) >= self.max_images:
+            return
+        attrs = dict(attrs)
+        image = _qualify_image(attrs.get("src") or "", attrs.get("alt") or "", self.page_url)
+        if image:
+            self.images.append(image)
+
+    def feed_bytes(self, chunk: bytes) -> bool:
+        if self.done:
+            return True
+        self.bytes_read += len(chunk)
+        self.feed(self._decoder.decode(chunk))
+        return self.done
+
+
+class ScrapeEngine:
+    """
+    Fetches many pages concurrently on a dedicated background event loop.
+
+    One httpx.AsyncClient (and its connection pool) is shared by every call,
+    each host gets at most `per_host` requests in flight, and a whole batch is
+    bounded by an overall deadline: pages that have not finished by then are
+    cancelled and the batch returns whatever completed.
+    """
+
+    def __init__(self, max_connections=SCRAPE_MAX_CONNECTIONS, per_host=SCRAPE_PER_HOST,
+                 timeout=SCRAPE_TIMEOUT_SECONDS, streaming=SCRAPE_STREAMING, max_bytes=SCRAPE_MAX_BYTES):
+        self.max_connections = max_connections
+        self.per_host = per_host
+        self.timeout = timeout
+        self.streaming = streaming
+        self.max_bytes = max_bytes
+        self._loop = None
+        self._client = None
+        self._host_limits = {}  # host -> [semaphore, requests queued or running]; dropped when idle
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="scrape-engine", daemon=True).start()
+        return self._loop
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # only ever called on the engine's loop
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                headers=HEADERS,
+                timeout=self.timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)
+            )
+        return self._client
+
+    @asynccontextmanager
+    async def _host_slot(self, host: str):
+        """Hold one of the host's `per_host` slots; only touched on the engine's loop, so no locking."""
+        entry = self._host_limits.get(host)
+        if entry is None:
+            entry = self._host_limits[host] = [asyncio.Semaphore(self.per_host), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._host_limits[host]
+
+    async def _images_for(self, url: str, max_images: int) -> list:
+        async with self._host_slot(urlparse(url).netloc):
+            with trace_call("http", "scrape", url=url) as call:
+                if not self.streaming:
+                    response = await self._get_client().get(url)
+                    call.set_bytes(len(response.content))
+                    return parse_images(response.text, url, max_images)
+                # leaving the stream context early closes the response without reading the rest
+                async with self._get_client().stream("GET", url) as response:
+                    collector = ImageCollector(url, max_images, self.max_bytes, response.charset_encoding)
+                    read = 0
+                    async for chunk in response.aiter_bytes(SCRAPE_CHUNK_SIZE):
+                        read += len(chunk)
+                        if collector.feed_bytes(chunk):
+                            break
+                    call.set_bytes(read)
+                    return collector.images
+
+    async def _scrape(self, urls: list, max_images: int, deadline: float) -> dict:
+        tasks = {asyncio.ensure_future(self._images_for(url, max_images)): url for url in urls}
+        if not tasks:
+            return {}
+        done, pending = await asyncio.wait(tasks, timeout=deadline)
+        for task in pending:
+            task.cancel()
+        if pending:
+            print(f"Image scrape deadline hit, skipped {len(pending)} of {len(tasks)} pages")
+        results = {url: [] for url in urls}
+        for task in done:
+            url = tasks[task]
+            if task.exception() is not None:
+                print(f"Image scrape failed from {url}: {task.exception()}")
+                continue
+            results[url] = task.result()
+        return results
+
+    def scrape_images(self, urls: list, max_images: int = 3, deadline: float = SCRAPE_DEADLINE_SECONDS) -> dict:
+        """
+        Blocking entry point: map each URL to its extracted images, fetching all
+        pages at once. URLs that fail or miss the deadline map to [].
+        """
+        future = asyncio.run_coroutine_threadsafe(
+            self._scrape(list(dict.fromkeys(urls)), max_images, deadline), self._ensure_loop()
+        )
+        try:
+            return future.result(timeout=deadline + 1)
+        except Exception as e:
+            print(f"Image scrape batch failed: {e}")
+            future.cancel()
+            return {url: [] for url in urls}
+
+
+scrape_engine = ScrapeEngine()
@@ -0,0 +1,96 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from dotenv import load_dotenv
+from utils.cache import register_cache
+from utils.telemetry import trace_call
+
+load_dotenv()
+
+SEARCH_CACHE_PATH = os.getenv("SEARCH_CACHE_PATH", os.path.join(".cache", "search_cache.sqlite3"))
+SEARCH_CACHE_TTL_SECONDS = int(os.getenv("SEARCH_CACHE_TTL_SECONDS", "86400"))
+
+
+def normalize_search_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def search_cache_key(query: str, **params) -> str:
+    payload = json.dumps({"query": normalize_search_query(query), **params}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SearchCache:
+    """
+    Persistent cache of search API responses in a small SQLite database, so
+    repeated topics survive restarts and are shared by every worker process.
+    """
+
+    def __init__(self, path=SEARCH_CACHE_PATH, ttl_seconds=SEARCH_CACHE_TTL_SECONDS):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS search_cache ("
+                " key TEXT PRIMARY KEY, query TEXT, response TEXT, created_at REAL)"
+            )
+            self._conn.commit()
+        register_cache("search", self)
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM search_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or time.time() - row[1] > self.ttl_seconds:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, query: str, response) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search_cache (key, query, response, created_at) VALUES (?, ?, ?, ?)",
+                (key, query, json.dumps(response, default=str), time.time())
+            )
+            self._conn.execute("DELETE FROM search_cache WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "size": size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+search_cache = SearchCache()
+
+
+def cached_search(client, query: str, **params) -> dict:
+    """`client.search(query=query, **params)`, answered from the cache when possible."""
+    key = search_cache_key(query, **params)
+    response = search_cache.get(key)
+    if response is not None:
+        print(f"[SEARCH CACHE] hit for '{query}'")
+        return response
+    with trace_call("tavily", "search") as call:
+        response = client.search(query=query, **params)
+        call.set_bytes(len(json.dumps(response, default=str)))
+    search_cache.set(key, query, response)
+    return response
@@ -1,20 +1,186 @@
-import snowflake.connector
 import os
+import threading
+import time
+from contextlib import contextmanager
 from dotenv import load_dotenv
+from utils.telemetry import trace_call
 
 load_dotenv()
 
+POOL_MIN_SIZE = int(os.getenv("SNOWFLAKE_POOL_MIN_SIZE", "1"))
+POOL_MAX_SIZE = int(os.getenv("SNOWFLAKE_POOL_MAX_SIZE", "8"))
+POOL_IDLE_TIMEOUT = int(os.getenv("SNOWFLAKE_POOL_IDLE_TIMEOUT", "600"))  # seconds
+POOL_ACQUIRE_TIMEOUT = int(os.getenv("SNOWFLAKE_POOL_ACQUIRE_TIMEOUT", "30"))  # seconds
+POOL_HEALTH_CHECK_AFTER = int(os.getenv("SNOWFLAKE_POOL_HEALTH_CHECK_AFTER", "60"))  # seconds idle
+
+
 def get_snowflake_connection():
     """
     Establish and return a Snowflake connection using credentials from .env.
     """
-    conn = snowflake.connector.connect(
-        user=os.getenv("SNOWFLAKE_USER"),
-        password=os.getenv("SNOWFLAKE_PASSWORD"),
-        account=os.getenv("SNOWFLAKE_ACCOUNT"),
-        warehouse=os.getenv("SNOWFLAKE_WAREHOUSE"),
-        database=os.getenv("SNOWFLAKE_DATABASE"),
-        schema=os.getenv("SNOWFLAKE_SCHEMA"),
-        role=os.getenv("SNOWFLAKE_ROLE", None)  # optional
-    )
-    return conn
\ No newline at end of file
+    import snowflake.connector
+    with trace_call("snowflake", "connect"):
+        conn = snowflake.connector.connect(
+            user=os.getenv("SNOWFLAKE_USER"),
+            password=os.getenv("SNOWFLAKE_PASSWORD"),
+            account=os.getenv("SNOWFLAKE_ACCOUNT"),
+            warehouse=os.getenv("SNOWFLAKE_WAREHOUSE"),
+            database=os.getenv("SNOWFLAKE_DATABASE"),
+            schema=os.getenv("SNOWFLAKE_SCHEMA"),
+            role=os.getenv("SNOWFLAKE_ROLE", None),  # optional
+            # keep pooled sessions alive server-side while they sit idle
+            client_session_keep_alive=True
+        )
+    return conn
+
+
+class SnowflakeConnectionPool:
+    """
+    Thread-safe pool of reusable Snowflake connections.
+
+    - At most `max_size` connections exist at once; callers block (up to
+      `acquire_timeout`) when all are checked out.
+    - Connections are opened lazily, on demand. Connections idle longer than
+      `idle_timeout` are closed, but eviction never shrinks the pool below
+      `min_size`; it is a floor for eviction, not a number opened up front.
+    - A connection that has been idle for `health_check_after` seconds is
+      verified with `SELECT 1` before being handed out.
+    """
+
+    def __init__(self, min_size=POOL_MIN_SIZE, max_size=POOL_MAX_SIZE, idle_timeout=POOL_IDLE_TIMEOUT,
+                 acquire_timeout=POOL_ACQUIRE_TIMEOUT, health_check_after=POOL_HEALTH_CHECK_AFTER,
+                 connect=get_snowflake_connection):
+        if min_size > max_size:
+            raise ValueError("min_size cannot exceed max_size")
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.acquire_timeout = acquire_timeout
+        self.health_check_after = health_check_after
+        self._connect = connect
+        self._idle = []  # list of (connection, last_used) tuples, most recently used last
+        self._size = 0
+        self._lock = threading.Condition()
+        self._closed = False
+
+    def acquire(self):
+        deadline = time.monotonic() + self.acquire_timeout
+        with self._lock:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Snowflake connection pool is closed")
+                self._evict_idle()
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    # reserve the slot, connect outside the lock
+                    self._size += 1
+                    conn, last_used = None, None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError("Timed out waiting for a Snowflake connection")
+                self._lock.wait(remaining)
+
+        if conn is None:
+            return self._open()
+        if time.monotonic() - last_used >= self.health_check_after and not self._is_healthy(conn):
+            # keep the slot reserved and replace the dead connection
+            self._close_quietly(conn)
+            return self._open()
+        return conn
+
+    def release(self, conn, broken: bool = False):
+        if broken or self._closed or conn.is_closed():
+            self._discard(conn)
+            return
+        with self._lock:
+            self._idle.append((conn, time.monotonic()))
+            self._lock.notify()
+
+    @contextmanager
+    def connection(self):
+        """Check a connection out for the duration of the `with` block."""
+        import snowflake.connector
+        conn = self.acquire()
+        broken = False
+        try:
+            yield conn
+        except snowflake.connector.errors.OperationalError:
+            broken = True
+            raise
+        finally:
+            self.release(conn, broken=broken)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._lock.notify_all()
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def _open(self):
+        try:
+            return self._connect()
+        except Exception:
+            with self._lock:
+                self._size -= 1
+                self._lock.notify()
+            raise
+
+    def _close_quietly(self, conn):
+        try:
+            conn.close()
+        except Exception as e:
+            print(f"Failed to close Snowflake connection: {e}")
+
+    def _discard(self, conn):
+        self._close_quietly(conn)
+        with self._lock:
+            self._size -= 1
+            self._lock.notify()
+
+    def _is_healthy(self, conn) -> bool:
+        if conn.is_closed():
+            return False
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            finally:
+                cursor.close()
+            return True
+        except Exception as e:
+            print(f"Pooled Snowflake connection failed health check: {e}")
+            return False
+
+    def _evict_idle(self):
+        # caller holds the lock; the oldest idle connections sit at the front
+        now = time.monotonic()
+        while self._idle and self._size > self.min_size and now - self._idle[0][1] > self.idle_timeout:
+            conn, _ = self._idle.pop(0)
+            self._size -= 1
+            self._close_quietly(conn)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_connection_pool() -> SnowflakeConnectionPool:
+    """Return the process-wide Snowflake connection pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SnowflakeConnectionPool()
+        return _pool
+
+
+@contextmanager
+def snowflake_connection():
+    """Borrow a pooled Snowflake connection: `with snowflake_connection() as conn: ...`"""
+    with get_connection_pool().connection() as conn:
+        yield conn
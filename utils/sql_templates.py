@@ -0,0 +1,293 @@
+import calendar
+import os
+import re
+from datetime import date, timedelta
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SQL_TEMPLATES_ENABLED = os.getenv("SQL_TEMPLATES_ENABLED", "true").lower() == "true"
+DEFAULT_TOP_N = 10
+MAX_TOP_N = 100
+# keywords need this many visits in the first half of the range to rank by growth
+GROWTH_MIN_VISITS = int(os.getenv("SQL_TEMPLATES_GROWTH_MIN_VISITS", "1000"))
+
+TABLE_NAME = "ON_SITE_SEARCH"
+COUNTRY = 840
+
+PLATFORMS = {
+    "amazon": "amazon", "walmart": "walmart", "target": "target", "best buy": "bestbuy", "bestbuy": "bestbuy",
+    "ebay": "ebay", "etsy": "etsy", "costco": "costco", "home depot": "homedepot", "homedepot": "homedepot",
+    "lowes": "lowes", "lowe's": "lowes", "wayfair": "wayfair", "kohls": "kohls", "kohl's": "kohls",
+    "macys": "macys", "macy's": "macys", "chewy": "chewy", "sephora": "sephora", "ulta": "ulta",
+    "temu": "temu", "shein": "shein",
+}
+MONTHS = {name.lower(): i for i, name in enumerate(calendar.month_name) if name}
+MONTHS.update({name.lower(): i for i, name in enumerate(calendar.month_abbr) if name})
+
+_TOP_N = re.compile(r"\btop\s+(\d{1,3})\b", re.I)
+_TOP_WORDS = re.compile(r"\b(top|most (?:searched|popular|common|frequent)|highest|biggest|leading|popular)\b", re.I)
+_KEYWORD_NOUNS = re.compile(r"\b(keywords?|products?|searches|search terms?|terms|queries|items|categories)\b", re.I)
+_TREND_WORDS = re.compile(r"\b(trend|trends|trended|trending|over time|monthly|weekly|daily|timeline|seasonal\w*)\b", re.I)
+_GROWTH_WORDS = re.compile(r"\b(fastest[- ]growing|growing|grown|grew|growth|rising|risers?|gaining|surging|breakout|emerging)\b", re.I)
+_COMPARE_WORDS = re.compile(r"\b(compare|comparison|versus|vs\.?|across platforms|between)\b", re.I)
+_GRANULARITY = [(re.compile(r"\b(daily|per day|by day)\b", re.I), "day"),
+                (re.compile(r"\b(weekly|per week|by week)\b", re.I), "week")]
+
+# double quotes, curly quotes, or single quotes that are not apostrophes ("what's", "lowe's")
+_QUOTED = re.compile(r"\"([^\"]{2,60})\"|“([^”]{2,60})”|(?<!\w)'([^']{2,60})'(?!\w)")
+_KEYWORD_AFTER = re.compile(
+    r"\b(?:trends?|trended|trending|searches|search volume|search interest|interest|demand|popularity|visits)"
+    r"\s+(?:for|of|in|on)\s+(?P<kw>[a-z0-9][a-z0-9 &+.%-]{1,60}?)"
+    r"(?=\s+(?:on|in|at|over|from|between|during|across|since|vs|versus|by|for)\b|[?.,!]|$)",
+    re.I,
+)
+_KEYWORD_BEFORE = re.compile(
+    r"\b(?:how (?:has|have|did|do|does|is|are)\s+)(?P<kw>[a-z0-9][a-z0-9 &+.%-]{1,60}?)"
+    r"\s+(?:searches\s+|search volume\s+|demand\s+)?(?:trend|trended|trending|grown|grow|changed|change|performed)\b",
+    re.I,
+)
+# "air fryer searches on Amazon vs Walmart": the keyword precedes the search noun
+_KEYWORD_NOUN = re.compile(
+    r"\b(?:compare|comparing)\s+(?:the\s+)?(?P<kw>[a-z0-9][a-z0-9 &+.%-]{1,60}?)"
+    r"\s+(?:searches|search volume|search interest|demand|popularity|visits|traffic)\b",
+    re.I,
+)
+# open-ended ranges, exclusions and audience filters the templates cannot express; the LLM handles these
+_QUALIFIERS = re.compile(
+    r"\b(since|before|after|until|till|through|prior to|up to|excluding|exclude|except|without|not|other than|"
+    r"outside|among|only|women|men|female|male|kids|children|teens?|gen z|millennials|age[sd]?|income|"
+    r"mobile|desktop|devices?|states?|regions?|cit(?:y|ies)|average|share|percent(?:age)?|ratio|year[- ]over[- ]year|yoy)\b",
+    re.I,
+)
+_YEAR = re.compile(r"\b(20\d{2})\b")
+_QUARTER = re.compile(r"\bq([1-4])\s*(20\d{2})\b", re.I)
+_MONTH_YEAR = re.compile(r"\b(" + "|".join(sorted(MONTHS, key=len, reverse=True)) + r")\.?\s+(20\d{2})\b", re.I)
+_LAST_N = re.compile(r"\b(?:last|past)\s+(\d{1,3})\s+(day|week|month|year)s?\b", re.I)
+# words a platform comparison may contain besides platforms, dates and the keyword
+_COMPARISON_VOCABULARY = set(
+    "compare comparison comparing versus vs between across and or the a an of on at in for to from during over "
+    "search searches volume interest demand popularity visits traffic how do does did what is are was were with platforms platform "
+    "sites 's".split()
+)
+_NOT_A_KEYWORD = {"amazon", "walmart", "target", "platform", "platforms", "products", "keywords", "searches", "total"}
+
+
+def sql_literal(value: str) -> str:
+    """Quote a value as a SQL string literal."""
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def like_contains(column: str, value: str) -> str:
+    """`column ILIKE '%value%'` with LIKE wildcards in `value` matched literally (escape char `!`)."""
+    escaped = re.sub(r"([!%_])", r"!\1", str(value))
+    return f"{column} ILIKE {sql_literal('%' + escaped + '%')} ESCAPE '!'"
+
+
+def _parse_date(value):
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(str(value).strip()[:10])
+    except ValueError:
+        return None
+
+
+def _month_end(year: int, month: int) -> date:
+    return date(year, month, calendar.monthrange(year, month)[1])
+
+
+def extract_dates(query: str, date_start: str = None, date_end: str = None, today: date = None):
+    """(start, end) from explicit ISO arguments, else from phrases like "Q2 2023", "March 2024", "in 2023", "last 6 months"."""
+    start, end = _parse_date(date_start), _parse_date(date_end)
+    if start and end:
+        return (start, end) if start <= end else (end, start)
+
+    today = today or date.today()
+    if match := _QUARTER.search(query):
+        quarter, year = int(match.group(1)), int(match.group(2))
+        return date(year, 3 * quarter - 2, 1), _month_end(year, 3 * quarter)
+    months = _MONTH_YEAR.findall(query)
+    if months:
+        spans = [(MONTHS[m.lower()], int(y)) for m, y in months]
+        first, last = min(spans, key=lambda s: (s[1], s[0])), max(spans, key=lambda s: (s[1], s[0]))
+        return date(first[1], first[0], 1), _month_end(last[1], last[0])
+    if match := _LAST_N.search(query):
+        n, unit = int(match.group(1)), match.group(2).lower()
+        days = {"day": 1, "week": 7, "month": 30, "year": 365}[unit] * n
+        return today - timedelta(days=days), today - timedelta(days=1)
+    years = sorted({int(y) for y in _YEAR.findall(query)})
+    if years:
+        return date(years[0], 1, 1), date(years[-1], 12, 31)
+    return None
+
+
+def extract_platforms(query: str, platform: str = None) -> list:
+    """Canonical platform names mentioned in the query, the `platform` argument first."""
+    found = []
+    if platform:
+        name = platform.strip().lower()
+        name = re.sub(r"^(https?://)?(www\.)?", "", name).split("/")[0]
+        name = re.sub(r"\.(com|net|co\.uk|ca)$", "", name)
+        found.append(PLATFORMS.get(name, name))
+    text = query.lower()
+    for alias, canonical in PLATFORMS.items():
+        if re.search(rf"\b{re.escape(alias)}\b", text) and canonical not in found:
+            found.append(canonical)
+    return [p for p in found if re.fullmatch(r"[a-z0-9][a-z0-9.&-]*", p)]
+
+
+def extract_keyword(query: str):
+    """The search keyword a question is about, from quotes or phrasing like "trend for air fryers"."""
+    if match := _QUOTED.search(query):
+        return next(g for g in match.groups() if g).strip().lower()
+    for pattern in (_KEYWORD_AFTER, _KEYWORD_BEFORE, _KEYWORD_NOUN):
+        if match := pattern.search(query):
+            keyword = match.group("kw").strip().lower()
+            keyword = re.sub(r"^(the|a|an)\s+", "", keyword)
+            if (keyword and keyword not in _NOT_A_KEYWORD and not _YEAR.fullmatch(keyword)
+                    and not extract_platforms(keyword)):
+                return keyword
+    return None
+
+
+def _unexplained_words(query: str, keyword: str = None) -> list:
+    """Words of a comparison question not accounted for by platforms, dates, the keyword or comparison phrasing."""
+    text = query.lower()
+    if keyword:
+        text = text.replace(keyword, " ")
+    for alias in sorted(PLATFORMS, key=len, reverse=True):
+        text = re.sub(rf"\b{re.escape(alias)}(?:\.com)?\b", " ", text)
+    for pattern in (_QUARTER, _MONTH_YEAR, _LAST_N, _YEAR):
+        text = pattern.sub(" ", text)
+    return [word for word in re.findall(r"[a-z0-9']+", text) if word not in _COMPARISON_VOCABULARY]
+
+
+def extract_top_n(query: str) -> int:
+    match = _TOP_N.search(query)
+    return min(max(int(match.group(1)), 1), MAX_TOP_N) if match else DEFAULT_TOP_N
+
+
+def classify_intent(query: str, platform: str = None, date_start: str = None, date_end: str = None):
+    """
+    Map a question onto one of the SQL templates.
+    Returns (intent, slots) or None when no template fits confidently.
+    """
+    if _QUALIFIERS.search(query):
+        return None
+    dates = extract_dates(query, date_start, date_end)
+    platforms = extract_platforms(query, platform)
+    if dates is None or not platforms:
+        return None
+    slots = {
+        "start": dates[0],
+        "end": dates[1],
+        "platforms": platforms,
+        "keyword": extract_keyword(query),
+        "n": extract_top_n(query),
+    }
+    mentioned = extract_platforms(query)
+    if _COMPARE_WORDS.search(query):
+        if len(mentioned) < 2 and "across platforms" not in query.lower():
+            return None  # comparing periods or keywords, not platforms
+        if _unexplained_words(query, slots["keyword"]):
+            return None  # e.g. a product phrase we could not pin down as the keyword
+        slots["platforms"] = mentioned or platforms
+        return "platform_comparison", slots
+    if _GROWTH_WORDS.search(query) and slots["keyword"] is None:
+        return "growth_leaders", slots
+    if (_TREND_WORDS.search(query) or _GROWTH_WORDS.search(query)) and slots["keyword"]:
+        slots["granularity"] = next((g for pattern, g in _GRANULARITY if pattern.search(query)), "month")
+        return "keyword_trend", slots
+    if _TOP_WORDS.search(query) and (_KEYWORD_NOUNS.search(query) or _TOP_N.search(query)):
+        return "top_keywords", slots
+    return None
+
+
+def _where(slots: dict, platforms: list) -> str:
+    site_filter = " OR ".join(like_contains("SITE_RULE", p) for p in platforms)
+    clauses = [
+        f"COUNTRY = {COUNTRY}",
+        f"({site_filter})" if len(platforms) > 1 else site_filter,
+        f"DATE BETWEEN {sql_literal(slots['start'].isoformat())} AND {sql_literal(slots['end'].isoformat())}",
+    ]
+    if slots.get("keyword"):
+        clauses.append(like_contains("OSS_KEYWORD", slots["keyword"]))
+    return " AND ".join(clauses)
+
+
+def _top_keywords(slots: dict) -> tuple:
+    sql = (
+        f"SELECT OSS_KEYWORD, SUM(CALIBRATED_VISITS) AS TOTAL_VISITS, SUM(CALIBRATED_USERS) AS TOTAL_USERS "
+        f"FROM {TABLE_NAME} WHERE {_where(slots, slots['platforms'][:1])} "
+        f"GROUP BY OSS_KEYWORD ORDER BY TOTAL_VISITS DESC LIMIT {slots['n']}"
+    )
+    explanation = (f"Top {slots['n']} search keywords on {slots['platforms'][0]} by calibrated visits "
+                   f"between {slots['start']} and {slots['end']}.")
+    return sql, explanation
+
+
+def _keyword_trend(slots: dict) -> tuple:
+    unit = slots.get("granularity", "month")
+    period = f"{unit.upper()}_START"
+    sql = (
+        f"SELECT DATE_TRUNC('{unit}', DATE) AS {period}, SUM(CALIBRATED_VISITS) AS TOTAL_VISITS, "
+        f"SUM(CALIBRATED_USERS) AS TOTAL_USERS "
+        f"FROM {TABLE_NAME} WHERE {_where(slots, slots['platforms'][:1])} "
+        f"GROUP BY {period} ORDER BY {period}"
+    )
+    explanation = (f"{unit.capitalize()}ly calibrated visits for searches matching '{slots['keyword']}' "
+                   f"on {slots['platforms'][0]} between {slots['start']} and {slots['end']}.")
+    return sql, explanation
+
+
+def _platform_comparison(slots: dict) -> tuple:
+    sql = (
+        f"SELECT SITE_RULE, SUM(CALIBRATED_VISITS) AS TOTAL_VISITS, SUM(CALIBRATED_USERS) AS TOTAL_USERS "
+        f"FROM {TABLE_NAME} WHERE {_where(slots, slots['platforms'])} "
+        f"GROUP BY SITE_RULE ORDER BY TOTAL_VISITS DESC"
+    )
+    subject = f"searches matching '{slots['keyword']}'" if slots.get("keyword") else "all searches"
+    explanation = (f"Calibrated visits for {subject} compared across {', '.join(slots['platforms'])} "
+                   f"between {slots['start']} and {slots['end']}.")
+    return sql, explanation
+
+
+def _growth_leaders(slots: dict) -> tuple:
+    midpoint = slots["start"] + (slots["end"] - slots["start"]) / 2 + timedelta(days=1)
+    mid = sql_literal(midpoint.isoformat())
+    sql = (
+        f"WITH PERIODS AS (SELECT OSS_KEYWORD, "
+        f"SUM(CASE WHEN DATE < {mid} THEN CALIBRATED_VISITS ELSE 0 END) AS EARLY_VISITS, "
+        f"SUM(CASE WHEN DATE >= {mid} THEN CALIBRATED_VISITS ELSE 0 END) AS LATE_VISITS "
+        f"FROM {TABLE_NAME} WHERE {_where(slots, slots['platforms'][:1])} GROUP BY OSS_KEYWORD) "
+        f"SELECT OSS_KEYWORD, LATE_VISITS - EARLY_VISITS AS VISIT_GROWTH, "
+        f"(LATE_VISITS - EARLY_VISITS) / NULLIF(EARLY_VISITS, 0) AS GROWTH_RATE, EARLY_VISITS, LATE_VISITS "
+        f"FROM PERIODS WHERE EARLY_VISITS >= {GROWTH_MIN_VISITS} ORDER BY VISIT_GROWTH DESC LIMIT {slots['n']}"
+    )
+    explanation = (f"Top {slots['n']} keywords on {slots['platforms'][0]} by growth in calibrated visits "
+                   f"from {slots['start']}..{midpoint - timedelta(days=1)} to {midpoint}..{slots['end']}.")
+    return sql, explanation
+
+
+TEMPLATES = {
+    "top_keywords": _top_keywords,
+    "keyword_trend": _keyword_trend,
+    "platform_comparison": _platform_comparison,
+    "growth_leaders": _growth_leaders,
+}
+
+
+def sql_from_template(query: str, platform: str = None, date_start: str = None, date_end: str = None):
+    """
+    {"sql", "explanation", "intent"} for questions a template answers, else None
+    (the caller falls back to LLM generation).
+    """
+    if not SQL_TEMPLATES_ENABLED:
+        return None
+    match = classify_intent(query, platform, date_start, date_end)
+    if match is None:
+        return None
+    intent, slots = match
+    sql, explanation = TEMPLATES[intent](slots)
+    return {"sql": sql, "explanation": explanation, "intent": intent}
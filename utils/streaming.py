@@ -0,0 +1,67 @@
+import json
+import time
+
+# graph nodes we report progress for; nested runnables inside a node are ignored
+GRAPH_NODES = {"oracle", "snowflake_tool", "web_search_tool", "image_generator_tool", "final_report_tool"}
+
+
+def format_sse(event: str, data) -> str:
+    """Serialize one server-sent event frame."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _describe_actions(output) -> list:
+    steps = (output or {}).get("intermediate_steps", []) if isinstance(output, dict) else []
+    return [{"tool": step.tool, "tool_input": step.tool_input} for step in steps]
+
+
+def _report_section(tags: list):
+    """Report section a streamed token belongs to (see final_report_agent), if any."""
+    for tag in tags:
+        if tag.startswith("report_section:"):
+            return tag.split(":", 1)[1]
+    return None
+
+
+async def stream_graph_events(runnable, state):
+    """
+    Drive the compiled graph and yield (event, payload) tuples describing its progress:
+
+    - node_start / node_end for every graph node, node_end carrying the duration in ms
+    - oracle_decision with the tool calls picked by the oracle
+    - token for each chunk of the report written by the final_report_tool node,
+      tagged with the report section it belongs to
+    - graph_end with the final graph state (always the last item)
+    """
+    started = {}
+    final_state = None
+
+    async for event in runnable.astream_events(state, version="v2"):
+        kind = event["event"]
+        name = event.get("name")
+        metadata = event.get("metadata", {})
+
+        if kind == "on_chain_end" and not event.get("parent_ids"):
+            final_state = event["data"].get("output")
+            continue
+
+        if kind == "on_chat_model_stream" and metadata.get("langgraph_node") == "final_report_tool":
+            content = event["data"]["chunk"].content
+            if content:
+                yield "token", {"text": content, "section": _report_section(event.get("tags", []))}
+            continue
+
+        if name not in GRAPH_NODES or metadata.get("langgraph_node") != name:
+            continue
+
+        if kind == "on_chain_start":
+            started[event["run_id"]] = time.perf_counter()
+            yield "node_start", {"node": name, "step": metadata.get("langgraph_step")}
+        elif kind == "on_chain_end":
+            start = started.pop(event["run_id"], None)
+            duration_ms = round((time.perf_counter() - start) * 1000) if start else None
+            yield "node_end", {"node": name, "step": metadata.get("langgraph_step"), "duration_ms": duration_ms}
+            if name == "oracle":
+                yield "oracle_decision", {"tool_calls": _describe_actions(event["data"].get("output"))}
+
+    yield "graph_end", final_state
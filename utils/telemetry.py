@@ -0,0 +1,229 @@
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dotenv import load_dotenv
+from langchain_core.callbacks import BaseCallbackHandler
+from utils.cache import cache_stats
+
+load_dotenv()
+
+# OpenTelemetry spans are opt-in; Prometheus metrics are always recorded when the client is installed
+OTEL_TRACING = os.getenv("OTEL_TRACING", "false").lower() == "true"
+OTEL_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "research-assistant")
+
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+BYTES_BUCKETS = (1e3, 1e4, 1e5, 5e5, 1e6, 5e6, 1e7, 5e7)
+
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, REGISTRY, generate_latest
+    from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+except ImportError:  # metrics become no-ops
+    REGISTRY = None
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _NoopMetric:
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, value):
+        pass
+
+    def inc(self, amount=1):
+        pass
+
+
+def _metric(kind: str, name: str, documentation: str, labels: list, **kwargs):
+    if REGISTRY is None:
+        return _NoopMetric()
+    return {"counter": Counter, "histogram": Histogram}[kind](name, documentation, labels, **kwargs)
+
+
+NODE_DURATION = _metric("histogram", "graph_node_duration_seconds", "Duration of LangGraph node runs",
+                        ["node"], buckets=LATENCY_BUCKETS)
+NODE_ERRORS = _metric("counter", "graph_node_errors_total", "LangGraph node runs that raised", ["node"])
+CALL_DURATION = _metric("histogram", "external_call_duration_seconds", "Duration of calls to external services",
+                        ["service", "operation"], buckets=LATENCY_BUCKETS)
+CALL_ERRORS = _metric("counter", "external_call_errors_total", "External calls that raised",
+                      ["service", "operation"])
+PAYLOAD_BYTES = _metric("histogram", "external_payload_bytes", "Bytes received from external services",
+                        ["service", "operation"], buckets=BYTES_BUCKETS)
+TOKENS = _metric("counter", "llm_tokens_total", "LLM tokens used", ["service", "model", "kind"])
+
+
+class _CacheCollector:
+    """Exports the counters every cache already keeps (see utils.cache.register_cache) at scrape time."""
+
+    def collect(self):
+        hits = CounterMetricFamily("cache_hits", "Cache hits", labels=["cache"])
+        misses = CounterMetricFamily("cache_misses", "Cache misses", labels=["cache"])
+        size = GaugeMetricFamily("cache_entries", "Entries held by the cache", labels=["cache"])
+        for name, stats in cache_stats().items():
+            hits.add_metric([name], stats.get("hits", 0))
+            misses.add_metric([name], stats.get("misses", 0))
+            if "size" in stats:
+                size.add_metric([name], stats["size"])
+        yield from (hits, misses, size)
+
+
+if REGISTRY is not None:
+    REGISTRY.register(_CacheCollector())
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def _get_tracer():
+    """OpenTelemetry tracer when OTEL_TRACING is enabled and the API is installed, otherwise None."""
+    global _tracer
+    if not OTEL_TRACING:
+        return None
+    with _tracer_lock:
+        if _tracer is None:
+            try:
+                from opentelemetry import trace
+            except ImportError:
+                print("[TELEMETRY] OTEL_TRACING is set but opentelemetry is not installed")
+                return None
+            if os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"):
+                try:
+                    from opentelemetry.sdk.resources import Resource
+                    from opentelemetry.sdk.trace import TracerProvider
+                    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+                    from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+                    provider = TracerProvider(resource=Resource.create({"service.name": OTEL_SERVICE_NAME}))
+                    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+                    trace.set_tracer_provider(provider)
+                except ImportError:
+                    print("[TELEMETRY] OTLP exporter not installed; spans go to the default provider")
+            _tracer = trace.get_tracer("research_assistant")
+        return _tracer
+
+
+class CallRecord:
+    """Details a traced call can attach while it runs."""
+
+    def __init__(self, service: str, operation: str, span=None):
+        self.service = service
+        self.operation = operation
+        self.span = span
+
+    def set_bytes(self, nbytes: int) -> None:
+        PAYLOAD_BYTES.labels(self.service, self.operation).observe(nbytes)
+        self.set_attribute("payload_bytes", nbytes)
+
+    def set_tokens(self, model: str, prompt_tokens: int = 0, completion_tokens: int = 0) -> None:
+        record_tokens(self.service, model, prompt_tokens, completion_tokens)
+        self.set_attribute("prompt_tokens", prompt_tokens)
+        self.set_attribute("completion_tokens", completion_tokens)
+
+    def set_attribute(self, key: str, value) -> None:
+        if self.span is not None:
+            self.span.set_attribute(key, value)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """An OpenTelemetry span when tracing is enabled, otherwise nothing."""
+    tracer = _get_tracer()
+    if tracer is None:
+        yield None
+        return
+    with tracer.start_as_current_span(name) as current:
+        for key, value in attributes.items():
+            current.set_attribute(key, value)
+        yield current
+
+
+@contextmanager
+def trace_call(service: str, operation: str, **attributes):
+    """
+    Time one call to an external service: `with trace_call("tavily", "search") as call: ...`
+    Errors are counted and re-raised.
+    """
+    start = time.perf_counter()
+    with span(f"{service}.{operation}", **attributes) as current:
+        call = CallRecord(service, operation, current)
+        try:
+            yield call
+        except Exception:
+            CALL_ERRORS.labels(service, operation).inc()
+            raise
+        finally:
+            CALL_DURATION.labels(service, operation).observe(time.perf_counter() - start)
+
+
+def traced_node(name: str, func):
+    """Wrap a graph node function so each run is timed and failures are counted."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        with span(f"node.{name}"):
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                NODE_ERRORS.labels(name).inc()
+                raise
+            finally:
+                NODE_DURATION.labels(name).observe(time.perf_counter() - start)
+    return wrapper
+
+
+def record_tokens(service: str, model: str, prompt_tokens: int = 0, completion_tokens: int = 0) -> None:
+    TOKENS.labels(service, model or "unknown", "prompt").inc(prompt_tokens or 0)
+    TOKENS.labels(service, model or "unknown", "completion").inc(completion_tokens or 0)
+
+
+def record_openai_usage(call: CallRecord, response) -> None:
+    """Token usage of an OpenAI/Mistral SDK response, when it reports any."""
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        call.set_tokens(getattr(response, "model", None), getattr(usage, "prompt_tokens", 0),
+                        getattr(usage, "completion_tokens", 0))
+
+
+class LLMTelemetryHandler(BaseCallbackHandler):
+    """LangChain callback recording duration, token usage and errors of chat model calls."""
+
+    def __init__(self, service: str = "openai"):
+        self.service = service
+        self._started = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        start = self._started.pop(run_id, None)
+        if start is not None:
+            CALL_DURATION.labels(self.service, "chat").observe(time.perf_counter() - start)
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        model = (response.llm_output or {}).get("model_name")
+        if not usage:
+            # streamed responses report usage on the message instead
+            for generations in response.generations:
+                for generation in generations:
+                    metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                    usage = {"prompt_tokens": metadata.get("input_tokens", 0),
+                             "completion_tokens": metadata.get("output_tokens", 0)}
+        record_tokens(self.service, model, usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0))
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._started.pop(run_id, None)
+        CALL_ERRORS.labels(self.service, "chat").inc()
+
+
+# shared by every ChatOpenAI instance: `ChatOpenAI(..., callbacks=[llm_telemetry])`
+llm_telemetry = LLMTelemetryHandler()
+
+
+def metrics_payload() -> tuple:
+    """(body, content type) for the Prometheus /metrics endpoint."""
+    if REGISTRY is None:
+        return b"# prometheus_client is not installed\n", CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST